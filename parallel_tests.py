@@ -0,0 +1,220 @@
+"""
+Параллельный прогон тестов обоих проектов.
+
+Запуск: python parallel_tests.py [--workers N]. Тесты ya_news и ya_note
+идут одновременно, каждый набор делится на части по процессам.
+Миграции выполняются один раз в файл-шаблон, который переиспользуется,
+пока не изменились миграции и импортируемые ими модули; каждый процесс
+работает со своей копией.
+
+Этот же модуль подключается к pytest как плагин (-p parallel_tests):
+он отбирает тесты своей части и подменяет создание тестовой БД
+копированием шаблона.
+"""
+import argparse
+import ast
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent
+PROJECTS = {
+    'ya_news': 'yanews.settings',
+    'ya_note': 'yanote.settings',
+}
+# Кеш шаблонов в каталоге пользователя: общий /tmp позволил бы другому
+# пользователю подложить свой шаблон.
+CACHE_DIR = Path(
+    os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+) / 'django_testing'
+# pytest завершается с этим кодом, если в часть не попало ни одного теста.
+NO_TESTS_COLLECTED = 5
+
+MIGRATE = '''
+import sys
+import django
+from django.conf import settings
+django.setup()
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+from django.core.management import call_command
+call_command('migrate', verbosity=0)
+'''
+
+
+def migration_sources(project):
+    """
+    Файлы миграций и модули проекта, которые они импортируют.
+
+    Импорты отслеживаются рекурсивно внутри проекта и yacommon;
+    Django и стандартная библиотека учитываются версией Django.
+    """
+    roots = (BASE_DIR / project, BASE_DIR)
+    pending = sorted((BASE_DIR / project).glob('*/migrations/*.py'))
+    sources = set(pending)
+    while pending:
+        tree = ast.parse(pending.pop().read_bytes())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module, root in product(modules, roots):
+                path = root.joinpath(*module.split('.'))
+                candidates = (path.with_suffix('.py'), path / '__init__.py')
+                for candidate in candidates:
+                    if candidate.is_file() and candidate not in sources:
+                        sources.add(candidate)
+                        pending.append(candidate)
+    return sorted(sources)
+
+
+def template_path(project):
+    """Имя шаблона зависит от миграций: изменились — мигрируем заново."""
+    import django
+
+    digest = hashlib.sha256(django.__version__.encode())
+    for path in migration_sources(project):
+        digest.update(str(path.relative_to(BASE_DIR)).encode())
+        digest.update(path.read_bytes())
+    return CACHE_DIR / f'{project}-{digest.hexdigest()[:16]}.sqlite3'
+
+
+def build_template(project):
+    template = template_path(project)
+    if template.exists():
+        return template, False
+    CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    partial = template.with_suffix(f'.{os.getpid()}.tmp')
+    subprocess.run(
+        [sys.executable, '-c', MIGRATE, str(partial)],
+        cwd=BASE_DIR / project, check=True,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': PROJECTS[project]},
+    )
+    # Из-за WAL часть страниц может остаться в журнале: переносим их
+    # в основной файл, чтобы копия была полной.
+    import sqlite3
+
+    with sqlite3.connect(partial) as connection:
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection.execute('PRAGMA journal_mode = DELETE')
+    partial.replace(template)
+    return template, True
+
+
+def run_shard(project, template, shard, shards, directory):
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': PROJECTS[project],
+        'PYTHONPATH': os.pathsep.join(
+            filter(None, (str(BASE_DIR), os.getenv('PYTHONPATH')))
+        ),
+        'TEST_SHARD': str(shard),
+        'TEST_SHARDS': str(shards),
+        'TEST_DB_TEMPLATE': str(template),
+        'TEST_DB_WORKER': str(
+            Path(directory) / f'{project}-{shard}.sqlite3'
+        ),
+    }
+    result = subprocess.run(
+        [sys.executable, '-m', 'pytest', '-p', 'parallel_tests', '-q',
+         '--tb=short'],
+        cwd=BASE_DIR / project, env=env, capture_output=True, text=True,
+    )
+    return project, shard, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 2,
+        help='Сколько процессов pytest запускать одновременно.'
+    )
+    options = parser.parse_args()
+    start = perf_counter()
+    # Каждому проекту — половина процессов, но не меньше одного.
+    shards = max(1, options.workers // len(PROJECTS))
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        with ThreadPoolExecutor(len(PROJECTS)) as pool:
+            templates = dict(zip(PROJECTS, pool.map(build_template, PROJECTS)))
+        for project, (template, created) in templates.items():
+            state = 'создан' if created else 'из кеша'
+            print(f'{project}: шаблон БД {state}: {template}')
+        jobs = [
+            (project, template, shard, shards, directory)
+            for project, (template, _) in templates.items()
+            for shard in range(shards)
+        ]
+        with ThreadPoolExecutor(len(jobs)) as pool:
+            for project, shard, result in pool.map(
+                lambda job: run_shard(*job), jobs
+            ):
+                lines = result.stdout.strip().splitlines()
+                summary = lines[-1] if lines else ''
+                print(f'{project} [{shard + 1}/{shards}]: {summary}')
+                if result.returncode not in (0, NO_TESTS_COLLECTED):
+                    failed = True
+                    print(result.stdout, result.stderr, sep='\n')
+    print(f'Всего: {perf_counter() - start:.1f} с')
+    return 1 if failed else 0
+
+
+# Плагин pytest: активен только в процессах, запущенных из main().
+
+def pytest_collection_modifyitems(config, items):
+    """Оставляем тесты своей части; класс TestCase целиком в одной."""
+    shards = int(os.getenv('TEST_SHARDS', '1'))
+    if shards < 2:
+        return
+    shard = int(os.environ['TEST_SHARD'])
+    groups = {}
+    selected, deselected = [], []
+    for item in items:
+        # Модуль и класс или функция: тесты одного класса делят
+        # setUpTestData, поэтому не разносим их по частям.
+        group = tuple(item.nodeid.split('::')[:2])
+        index = groups.setdefault(group, len(groups))
+        (selected if index % shards == shard else deselected).append(item)
+    if deselected:
+        items[:] = selected
+        config.hook.pytest_deselected(items=deselected)
+
+
+class TemplateDatabase:
+    """Тестовая БД процесса — копия шаблона, а не результат миграций."""
+
+    @pytest.fixture(scope='session')
+    def django_db_setup(self, django_test_environment, django_db_blocker):
+        from django.db import connection
+
+        worker = Path(os.environ['TEST_DB_WORKER'])
+        shutil.copyfile(os.environ['TEST_DB_TEMPLATE'], worker)
+        with django_db_blocker.unblock():
+            connection.close()
+            connection.settings_dict['NAME'] = str(worker)
+        yield
+        with django_db_blocker.unblock():
+            connection.close()
+        worker.unlink(missing_ok=True)
+
+
+def pytest_configure(config):
+    # Регистрируем после pytest-django, чтобы фикстура заменила его
+    # django_db_setup.
+    if os.getenv('TEST_DB_TEMPLATE'):
+        config.pluginmanager.register(TemplateDatabase(), 'template-db')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
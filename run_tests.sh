@@ -21,6 +21,11 @@ then
     echo $LF 1>&2
     if python structure_test.py
     then
+        if [[ "$1" == "--parallel" ]]; then
+            # Оба проекта одновременно, по частям в отдельных процессах.
+            python parallel_tests.py "${@:2}" 1>&2
+            exit $?
+        fi
         cd ya_news
         export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
         if pytest --tb=line 1>&2;
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, News
+from .models import Comment, ModerationTask, News
 
 
 class CommentInline(admin.StackedInline):
@@ -13,3 +13,9 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+
+
+@admin.register(ModerationTask)
+class ModerationTaskAdmin(admin.ModelAdmin):
+    list_display = ('comment', 'enqueued', 'claimed_by', 'finished_at')
+    list_filter = ('finished_at',)
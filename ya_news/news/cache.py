@@ -0,0 +1,125 @@
+"""Кеш отрендеренных фрагментов страницы новости."""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+BODY, THREAD = 'body', 'thread'
+HOME_PAGE = 'news:page:home'
+
+
+def _version_key(news_pk):
+    return f'news:version:{news_pk}'
+
+
+def get_news_version(news_pk):
+    """
+    Текущая версия фрагментов новости.
+
+    Версия — время её выпуска в наносекундах, а не счётчик: если
+    запись о версии вытеснят из кеша, новая не совпадёт со старой
+    и не оживит устаревшие фрагменты.
+    """
+    return cache.get_or_set(_version_key(news_pk), time.time_ns, None)
+
+
+def bump_news_version(news_pk):
+    """Делаем устаревшими все фрагменты новости."""
+    cache.set(_version_key(news_pk), time.time_ns(), None)
+
+
+def _fragment_keys(news_pk, version):
+    return {
+        name: f'news:detail:{name}:{news_pk}:{version}'
+        for name in (BODY, THREAD)
+    }
+
+
+def get_fragments(news_pk, version, names=(BODY, THREAD)):
+    """
+    Закешированные фрагменты или None, если нет хотя бы одного.
+
+    Версию читают до запроса к БД и передают сюда и в set_fragments:
+    если комментарий добавят во время рендера, фрагменты лягут под
+    старую версию и не будут отданы.
+    """
+    keys = _fragment_keys(news_pk, version)
+    found = cache.get_many([keys[name] for name in names])
+    if len(found) < len(names):
+        return None
+    return {name: found[keys[name]] for name in names}
+
+
+def set_fragments(news_pk, version, fragments):
+    keys = _fragment_keys(news_pk, version)
+    cache.set_many(
+        {keys[name]: html for name, html in fragments.items()},
+        settings.NEWS_DETAIL_CACHE_TIMEOUT
+    )
+
+
+def _generation_key(key):
+    return f'{key}:generation'
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _get_generation(key):
+    return cache.get_or_set(_generation_key(key), time.time_ns, None)
+
+
+def expire_page(key):
+    """
+    Объявляем закешированную страницу устаревшей.
+
+    Сама запись не удаляется: пока один процесс рендерит страницу
+    заново, остальные отдают устаревшую копию.
+    """
+    cache.set(_generation_key(key), time.time_ns(), None)
+
+
+def get_fresh_page(key):
+    """Свежая закешированная страница или None, без рендера и блокировок."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    entry_generation, fresh_until, page = entry
+    if entry_generation != _get_generation(key) or fresh_until <= time.time():
+        return None
+    return page
+
+
+def get_or_render_page(key, render):
+    """
+    Страница из кеша или результат render() с защитой от лавины.
+
+    render возвращает то, что нужно положить в кеш, или None, если
+    ответ кешировать нельзя. Свежая запись отдаётся как есть.
+    Устаревшую пересчитывает только процесс, взявший блокировку,
+    остальные в это время отдают её копию.
+    """
+    generation = _get_generation(key)
+    entry = cache.get(key)
+    if entry is not None:
+        entry_generation, fresh_until, page = entry
+        if entry_generation == generation and fresh_until > time.time():
+            return page
+    lock = _lock_key(key)
+    if not cache.add(lock, True, settings.PAGE_CACHE_LOCK_TIMEOUT):
+        if entry is not None:
+            return page
+        # Отдать нечего: рендерим сами, но кеш не трогаем.
+        return render()
+    try:
+        page = render()
+        if page is not None:
+            cache.set(
+                key,
+                (generation, time.time() + settings.PAGE_CACHE_TIMEOUT, page),
+                settings.PAGE_CACHE_TIMEOUT + settings.PAGE_CACHE_STALE_TIMEOUT
+            )
+        return page
+    finally:
+        cache.delete(lock)
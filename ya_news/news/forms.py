@@ -1,7 +1,10 @@
+from django import forms
+from django.conf import settings
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
 from .models import Comment
+from .moderation import get_matcher
 
 BAD_WORDS = (
     'редиска',
@@ -11,6 +14,10 @@ BAD_WORDS = (
 WARNING = 'Не ругайтесь!'
 
 
+def has_bad_words(text):
+    return get_matcher(BAD_WORDS).search(text)
+
+
 class CommentForm(ModelForm):
 
     class Meta:
@@ -18,10 +25,25 @@ class CommentForm(ModelForm):
         fields = ('text',)
 
     def clean_text(self):
-        """Не позволяем ругаться в комментариях."""
+        """
+        Не позволяем ругаться в комментариях.
+
+        В режиме очереди текст проверяют фоновые обработчики,
+        см. news.moderation_queue.
+        """
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if settings.NEWS_COMMENT_MODERATION == 'queue':
+            return text
+        if has_bad_words(text):
+            raise ValidationError(WARNING)
         return text
+
+
+class SearchForm(forms.Form):
+    """Параметры поиска по новостям и комментариям."""
+    q = forms.CharField(label='Запрос', max_length=200)
+    date_from = forms.DateField(label='С даты', required=False)
+    date_to = forms.DateField(label='По дату', required=False)
+    comments = forms.BooleanField(
+        label='Искать в комментариях', required=False
+    )
@@ -0,0 +1,77 @@
+import random
+from time import perf_counter
+from timeit import repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from news.forms import BAD_WORDS
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def loop_search(words, text):
+    """Прежняя проверка: поиск подстрок по очереди."""
+    lowered_text = text.lower()
+    return any(word in lowered_text for word in words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает проверку комментария на запрещённые слова '
+        'циклом по списку и скомпилированным матчером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--words', type=int, nargs='+', default=(2, 1_000, 5_000),
+            help='Размеры списка запрещённых слов.'
+        )
+        parser.add_argument(
+            '--text-length', type=int, default=4_000,
+            help='Длина комментария в символах.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=20)
+
+    def handle(self, *args, **options):
+        generator = random.Random(0)
+        text = self.make_text(generator, options['text_length'])
+        matcher_class = import_string(settings.BAD_WORDS_MATCHER)
+        self.stdout.write(
+            f'{"words":>7} {"loop, µs":>10} {"matcher, µs":>12} '
+            f'{"build, ms":>10}'
+        )
+        for size in options['words']:
+            words = BAD_WORDS + tuple(
+                self.make_word(generator)
+                for _ in range(size - len(BAD_WORDS))
+            )
+            start = perf_counter()
+            matcher = matcher_class(words)
+            build = perf_counter() - start
+            loop = self.timeit(lambda: loop_search(words, text), options)
+            compiled = self.timeit(lambda: matcher.search(text), options)
+            self.stdout.write(
+                f'{size:>7} {loop:>10.1f} {compiled:>12.1f} '
+                f'{build * 1000:>10.1f}'
+            )
+
+    def timeit(self, function, options):
+        """Лучшее время одного вызова в микросекундах."""
+        best = min(repeat(
+            function, number=options['number'], repeat=options['repeat']
+        ))
+        return best / options['number'] * 1e6
+
+    def make_word(self, generator):
+        length = generator.randint(5, 12)
+        return ''.join(generator.choices(ALPHABET, k=length))
+
+    def make_text(self, generator, length):
+        """Текст без запрещённых слов: худший случай для обеих проверок."""
+        words = []
+        while sum(map(len, words)) + len(words) < length:
+            words.append(self.make_word(generator))
+        return ' '.join(words)[:length]
@@ -0,0 +1,132 @@
+import tempfile
+from copy import deepcopy
+from pathlib import Path
+from statistics import quantiles
+from threading import Barrier, Thread
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from news import write_behind
+from news.models import Comment, News
+
+User = get_user_model()
+
+MODES = {
+    # Режим: настройки на время замера.
+    'direct': {'NEWS_COMMENT_WRITE_BEHIND': False},
+    'write-behind': {'NEWS_COMMENT_WRITE_BEHIND': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Всплеск комментариев на временной базе: параллельные авторы '
+        'отправляют форму комментария, замеряется устойчивая скорость '
+        'записи и задержка POST без буфера и с write-behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posters', type=int, default=8)
+        parser.add_argument(
+            '--comments', type=int, default=200,
+            help='Комментариев от одного автора.'
+        )
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=tuple(MODES)
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"mode":>12} {"ok":>6} {"errors":>6} {"comments/s":>11} '
+            f'{"p50 ms":>7} {"p95 ms":>7}'
+        )
+        for mode in options['modes']:
+            with override_settings(**MODES[mode]):
+                ok, errors, elapsed, timings = self.run_mode(
+                    options['posters'], options['comments']
+                )
+            p50, p95 = (
+                quantiles(timings, n=100)[index] * 1000 for index in (49, 94)
+            )
+            self.stdout.write(
+                f'{mode:>12} {ok:>6} {errors:>6} {ok / elapsed:>11.0f} '
+                f'{p50:>7.2f} {p95:>7.2f}'
+            )
+
+    def run_mode(self, posters, comments):
+        # Как в bench_comment_writers: потоки берут соединения
+        # из общего словаря настроек, база подменяется в нём.
+        settings_dict = connections.settings['default']
+        saved = deepcopy(settings_dict)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                settings_dict['NAME'] = Path(directory) / 'bench.sqlite3'
+                connection.close()
+                call_command('migrate', verbosity=0)
+                news = News.objects.create(title='Новость', text='Текст')
+                clients = []
+                for index in range(posters):
+                    client = Client(HTTP_HOST='localhost')
+                    client.force_login(
+                        User.objects.create(username=f'burst-{index}')
+                    )
+                    clients.append(client)
+                # Свежий буфер со своим потоком записи на каждый замер.
+                write_behind.comment_buffer = write_behind.CommentBuffer()
+                connection.close()
+                return self.post(
+                    reverse('news:detail', args=(news.pk,)),
+                    clients, comments
+                )
+        finally:
+            write_behind.comment_buffer = write_behind.CommentBuffer()
+            connection.close()
+            settings_dict.clear()
+            settings_dict.update(saved)
+
+    def post(self, url, clients, comments):
+        results = []
+        barrier = Barrier(len(clients) + 1)
+
+        def poster(client):
+            ok = errors = 0
+            timings = []
+            barrier.wait()
+            for index in range(comments):
+                start = perf_counter()
+                try:
+                    response = client.post(url, {'text': f'Текст {index}'})
+                except Exception:
+                    # Например, «database is locked» после таймаута.
+                    response = None
+                timings.append(perf_counter() - start)
+                if response is not None and response.status_code == 302:
+                    ok += 1
+                else:
+                    errors += 1
+            connection.close()
+            results.append((ok, errors, timings))
+
+        threads = [Thread(target=poster, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = perf_counter()
+        for thread in threads:
+            thread.join()
+        # Скорость считаем по записанному в БД, с остатком буфера.
+        write_behind.comment_buffer.flush()
+        elapsed = perf_counter() - start
+        written = Comment.objects.count()
+        return (
+            written,
+            sum(errors for _, errors, _ in results),
+            elapsed,
+            [timing for *_, timings in results for timing in timings],
+        )
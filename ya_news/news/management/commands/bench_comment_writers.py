@@ -0,0 +1,114 @@
+import tempfile
+from copy import deepcopy
+from pathlib import Path
+from threading import Barrier, Thread
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from news.models import Comment, News
+
+User = get_user_model()
+
+# Настройки соединения до и после профиля из yacommon.sqlite.
+PROFILES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'tuned': None,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные писатели комментариев на временной базе: доля '
+        'ошибок «database is locked» и пропускная способность для '
+        'стандартного SQLite и профиля из settings.DATABASES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument(
+            '--comments', type=int, default=200,
+            help='Комментариев на одного писателя.'
+        )
+        parser.add_argument(
+            '--profiles', nargs='+', choices=PROFILES,
+            default=tuple(PROFILES)
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"profile":>8} {"ok":>6} {"errors":>6} {"error %":>8} '
+            f'{"comments/s":>11}'
+        )
+        for profile in options['profiles']:
+            ok, errors, elapsed = self.run_profile(
+                profile, options['writers'], options['comments']
+            )
+            total = ok + errors
+            self.stdout.write(
+                f'{profile:>8} {ok:>6} {errors:>6} '
+                f'{errors / total * 100:>8.1f} {ok / elapsed:>11.0f}'
+            )
+
+    def run_profile(self, profile, writers, comments):
+        # Потоки создают свои соединения из общего словаря настроек,
+        # поэтому профиль подменяется в нём на время замера.
+        settings_dict = connections.settings['default']
+        saved = deepcopy(settings_dict)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                settings_dict.update(deepcopy(PROFILES[profile] or {}))
+                settings_dict['NAME'] = Path(directory) / 'bench.sqlite3'
+                connection.close()
+                call_command('migrate', verbosity=0)
+                author = User.objects.create(username='bench-writers')
+                news = News.objects.create(title='Новость', text='Текст')
+                connection.close()
+                return self.write(news.pk, author.pk, writers, comments)
+        finally:
+            connection.close()
+            settings_dict.clear()
+            settings_dict.update(saved)
+
+    def write(self, news_pk, author_pk, writers, comments):
+        results = []
+        barrier = Barrier(writers + 1)
+
+        def writer():
+            ok = errors = 0
+            barrier.wait()
+            for _ in range(comments):
+                try:
+                    # Как при публикации из формы: чтение новости,
+                    # затем запись комментария в одной транзакции.
+                    with transaction.atomic():
+                        news = News.objects.get(pk=news_pk)
+                        Comment.objects.create(
+                            news=news, author_id=author_pk, text='Текст'
+                        )
+                    ok += 1
+                except OperationalError:
+                    errors += 1
+            connection.close()
+            results.append((ok, errors))
+
+        threads = [Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - start
+        return (
+            sum(ok for ok, _ in results),
+            sum(errors for _, errors in results),
+            elapsed,
+        )
@@ -0,0 +1,103 @@
+import tracemalloc
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.response import SimpleTemplateResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from news.models import Comment, News
+from news.views import NewsList
+
+User = get_user_model()
+
+DEFAULT_SIZES = (10, 1_000, 100_000)
+
+
+class CounterNewsList(NewsList):
+    """Текущая реализация без кеша страницы: замеряем сами запросы."""
+    page_cache_key = None
+
+
+class LegacyNewsList(CounterNewsList):
+    """Прежняя реализация: комментарии подгружаются ради их количества."""
+
+    def get_queryset(self):
+        return self.model.objects.prefetch_related(
+            'comment_set'
+        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for news in context['object_list']:
+            news.comment_count = len(news.comment_set.all())
+        return context
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов и пик памяти при рендере главной '
+        'страницы для разного количества комментариев на новость.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+            help='Количество комментариев на одну новость.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5_000,
+            help='Размер пачки для bulk_create.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"comments":>10} {"view":>8} {"queries":>8} '
+            f'{"peak, KiB":>10} {"time, ms":>9}'
+        )
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.populate(size, options['batch_size'])
+                for label, view in (
+                    ('legacy', LegacyNewsList), ('counter', CounterNewsList)
+                ):
+                    queries, peak, elapsed = self.measure(view)
+                    self.stdout.write(
+                        f'{size:>10} {label:>8} {queries:>8} '
+                        f'{peak / 1024:>10.1f} {elapsed * 1000:>9.1f}'
+                    )
+                transaction.set_rollback(True)
+
+    def populate(self, size, batch_size):
+        """Создаём новости главной страницы и комментарии к ним."""
+        author = User.objects.create(username='bench-home-page')
+        for index in range(settings.NEWS_COUNT_ON_HOME_PAGE):
+            news = News.objects.create(
+                title=f'Новость {index}', text='Текст', comment_count=size
+            )
+            Comment.objects.bulk_create(
+                (
+                    Comment(news=news, author=author, text='Текст ' * 20)
+                    for _ in range(size)
+                ),
+                batch_size=batch_size,
+            )
+
+    def measure(self, view_class):
+        request = RequestFactory().get('/', HTTP_HOST='localhost')
+        request.user = AnonymousUser()
+        view = view_class.as_view()
+        tracemalloc.start()
+        start = perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            response = view(request)
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        elapsed = perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return len(context), peak, elapsed
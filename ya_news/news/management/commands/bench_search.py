@@ -0,0 +1,96 @@
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, News
+from news.search import search
+
+User = get_user_model()
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ту', 'ле', 'на', 'по', 'ст', 'ви', 'зо', 'да', 'ре',
+    'бу', 'го', 'ше', 'ль', 'ны', 'жи', 'фа', 'хо', 'це', 'чу', 'ям', 'юр',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Индексирует комментарии через триггеры FTS5 и замеряет '
+        'число поисковых запросов в секунду.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--news', type=int, default=1_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--vocabulary', type=int, default=20_000,
+            help='Размер словаря; частоты слов подчиняются закону Ципфа.'
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='Сколько секунд гонять поисковые запросы.'
+        )
+
+    def handle(self, *args, **options):
+        generator = random.Random(0)
+        self.words = sorted({
+            ''.join(generator.choices(SYLLABLES, k=generator.randint(2, 4)))
+            for _ in range(options['vocabulary'])
+        })
+        generator.shuffle(self.words)
+        self.cum_weights = list(accumulate(
+            1 / rank for rank in range(1, len(self.words) + 1)
+        ))
+        with transaction.atomic():
+            elapsed = self.populate(generator, options)
+            self.stdout.write(
+                f'indexed {options["comments"]} comments: '
+                f'{options["comments"] / elapsed:.0f} rows/s'
+            )
+            for comments in (False, True):
+                qps = self.measure(generator, options['seconds'], comments)
+                target = 'comments' if comments else 'news'
+                self.stdout.write(f'search {target:>8}: {qps:>8.1f} q/s')
+            transaction.set_rollback(True)
+
+    def populate(self, generator, options):
+        author = User.objects.create(username='bench-search')
+        News.objects.bulk_create(
+            News(title=self.phrase(generator, 4), text=self.phrase(
+                generator, 40
+            ))
+            for _ in range(options['news'])
+        )
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        start = perf_counter()
+        for offset in range(0, options['comments'], options['batch_size']):
+            size = min(options['batch_size'], options['comments'] - offset)
+            Comment.objects.bulk_create(
+                Comment(
+                    news_id=generator.choice(news_ids), author=author,
+                    text=self.phrase(generator, 20)
+                )
+                for _ in range(size)
+            )
+        return perf_counter() - start
+
+    def measure(self, generator, seconds, comments):
+        """Запросы из двух слов, первая страница выдачи со сниппетами."""
+        done = 0
+        start = perf_counter()
+        while perf_counter() - start < seconds:
+            results = search(self.phrase(generator, 2), comments=comments)
+            len(results)
+            results[0:10]
+            done += 1
+        return done / (perf_counter() - start)
+
+    def phrase(self, generator, length):
+        return ' '.join(generator.choices(
+            self.words, cum_weights=self.cum_weights, k=length
+        ))
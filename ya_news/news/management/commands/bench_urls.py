@@ -0,0 +1,89 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.urls import app_name, urlpatterns
+from yacommon.bench import measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет тестовый клиент по всем маршрутам news.urls и выводит '
+        'JSON с перцентилями задержки, RPS и числом запросов к БД. '
+        'Данные готовит generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Запросы перед замером: прогрев кешей и шаблонов.'
+        )
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Нужно хотя бы два запроса на адрес.')
+        targets = self.targets()
+        results = {}
+        # Замеры не должны менять данные между прогонами.
+        with transaction.atomic():
+            for pattern in urlpatterns:
+                name = f'{app_name}:{pattern.name}'
+                if name not in targets:
+                    self.stderr.write(f'{name}: нет сценария, пропущен.')
+                    continue
+                results[name] = measure(
+                    *targets[name], options['requests'], options['warmup']
+                )
+            transaction.set_rollback(True)
+        report = json.dumps({
+            'database': connection.vendor,
+            'rows': {
+                'news': News.objects.count(),
+                'comments': Comment.objects.count(),
+            },
+            'requests': options['requests'],
+            'urls': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def targets(self):
+        """Клиент, метод, адрес и данные запроса для каждого маршрута."""
+        news = News.objects.order_by('-comment_count').first()
+        comment = Comment.objects.filter(news=news).first()
+        if comment is None:
+            raise CommandError(
+                'Нет новостей с комментариями, сначала выполните '
+                'generate_data.'
+            )
+        anonymous = Client(HTTP_HOST='localhost')
+        author = Client(HTTP_HOST='localhost')
+        author.force_login(comment.author)
+        return {
+            'news:home': (anonymous, 'get', reverse('news:home'), {}),
+            'news:search': (
+                anonymous, 'get', reverse('news:search'), {'q': 'город'}
+            ),
+            'news:detail': (
+                anonymous, 'get', reverse('news:detail', args=(news.pk,)), {}
+            ),
+            'news:comments': (
+                anonymous, 'get',
+                reverse('news:comments', args=(news.pk,)), {}
+            ),
+            'news:delete': (
+                author, 'get', reverse('news:delete', args=(comment.pk,)), {}
+            ),
+            'news:edit': (
+                author, 'get', reverse('news:edit', args=(comment.pk,)), {}
+            ),
+        }
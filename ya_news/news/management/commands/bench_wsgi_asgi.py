@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from time import perf_counter
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from news.models import News
+
+User = get_user_model()
+
+# Точка входа и значение NEWS_ASYNC_VIEWS для каждого режима.
+MODES = {
+    'wsgi': ('yanews.wsgi', '0'),
+    'asgi-sync': ('yanews.asgi', '0'),
+    'asgi': ('yanews.asgi', '1'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI на главной '
+        'и странице новости при параллельных клиентах и искусственной '
+        'задержке каждого SQL-запроса. Данные готовит generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=tuple(MODES)
+        )
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Запросов от каждого клиента.'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Потоков у WSGI-сервера.'
+        )
+        parser.add_argument(
+            '--latency', type=float, default=5,
+            help='Задержка каждого SQL-запроса, мс.'
+        )
+        parser.add_argument(
+            '--logged-in', type=float, default=0.25,
+            help='Доля клиентов с сессией: им страницы не отдаются из кеша.'
+        )
+        # Замер одного режима в отдельном процессе: пути в urls
+        # выбираются по NEWS_ASYNC_VIEWS при импорте.
+        parser.add_argument('--worker', choices=MODES, help='Служебный.')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+        self.stdout.write(
+            f'{"mode":>10} {"rps":>8} {"p50, ms":>8} {"p95, ms":>8} '
+            f'{"p99, ms":>8} {"errors":>7}'
+        )
+        for mode in options['modes']:
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'),
+                'bench_wsgi_asgi', '--worker', mode,
+            ]
+            for name in ('clients', 'requests', 'threads', 'latency'):
+                command += [f'--{name}', str(options[name])]
+            command += ['--logged-in', str(options['logged_in'])]
+            result = subprocess.run(
+                command, capture_output=True, text=True,
+                env={**os.environ, 'NEWS_ASYNC_VIEWS': MODES[mode][1]},
+            )
+            if result.returncode:
+                raise CommandError(f'{mode}: {result.stderr}')
+            report = json.loads(result.stdout)
+            self.stdout.write(
+                f'{mode:>10} {report["rps"]:>8.0f} {report["p50_ms"]:>8.1f} '
+                f'{report["p95_ms"]:>8.1f} {report["p99_ms"]:>8.1f} '
+                f'{report["errors"]:>7}'
+            )
+
+    def run_worker(self, options):
+        news = News.objects.order_by('-comment_count').first()
+        user = User.objects.first()
+        if news is None or user is None:
+            raise CommandError('База пуста, сначала выполните generate_data.')
+        login = Client()
+        login.force_login(user)
+        session = login.cookies[settings.SESSION_COOKIE_NAME].value
+        add_latency(options['latency'] / 1000)
+        paths = (reverse('news:home'), reverse('news:detail', args=(news.pk,)))
+        logged_in = int(options['clients'] * options['logged_in'])
+        plans = [
+            [
+                (paths[number % len(paths)], session if index < logged_in
+                 else None)
+                for number in range(options['requests'])
+            ]
+            for index in range(options['clients'])
+        ]
+        module, _ = MODES[options['worker']]
+        application = import_module(module).application
+        try:
+            if module.endswith('wsgi'):
+                results = run_wsgi(application, plans, options['threads'])
+            else:
+                results = asyncio.run(run_asgi(application, plans))
+        finally:
+            login.logout()
+        latencies = [latency for latency, _ in results]
+        elapsed = results.elapsed
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50_ms': cuts[49] * 1000,
+            'p95_ms': cuts[94] * 1000,
+            'p99_ms': cuts[98] * 1000,
+            'errors': sum(status != 200 for _, status in results),
+        }
+
+
+class Results(list):
+    """Задержки и коды ответов вместе с общим временем прогона."""
+    elapsed = 0.0
+
+
+def add_latency(seconds):
+    """Каждое новое соединение ждёт seconds перед каждым SQL-запросом."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+
+
+def call_wsgi(application, path, session):
+    environ = {}
+    setup_testing_defaults(environ)
+    environ.update(PATH_INFO=path, HTTP_HOST='localhost')
+    if session:
+        environ['HTTP_COOKIE'] = f'{settings.SESSION_COOKIE_NAME}={session}'
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    try:
+        b''.join(response)
+    finally:
+        # Как сервер: close() отправляет request_finished.
+        response.close()
+    return statuses[0]
+
+
+def run_wsgi(application, plans, threads):
+    for path, session in {request for plan in plans for request in plan}:
+        call_wsgi(application, path, session)
+    # Потоки сервера берут запросы из общей очереди по порядку.
+    server = ThreadPoolExecutor(threads)
+
+    def client(plan):
+        results = []
+        for request in plan:
+            start = perf_counter()
+            status = server.submit(call_wsgi, application, *request).result()
+            # Задержка включает ожидание свободного потока сервера.
+            results.append((perf_counter() - start, status))
+        return results
+
+    results = Results()
+    start = perf_counter()
+    with server, ThreadPoolExecutor(len(plans)) as clients:
+        for latencies in clients.map(client, plans):
+            results.extend(latencies)
+    results.elapsed = perf_counter() - start
+    return results
+
+
+async def call_asgi(application, path, session):
+    headers = [(b'host', b'localhost')]
+    if session:
+        headers.append(
+            (b'cookie', f'{settings.SESSION_COOKIE_NAME}={session}'.encode())
+        )
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'headers': headers,
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    start = perf_counter()
+    await application(scope, receive, send)
+    return perf_counter() - start, statuses[0]
+
+
+async def run_asgi(application, plans):
+    for path, session in {request for plan in plans for request in plan}:
+        await call_asgi(application, path, session)
+
+    async def client(plan):
+        return [await call_asgi(application, *request) for request in plan]
+
+    results = Results()
+    start = perf_counter()
+    for latencies in await asyncio.gather(*map(client, plans)):
+        results.extend(latencies)
+    results.elapsed = perf_counter() - start
+    return results
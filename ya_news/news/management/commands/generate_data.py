@@ -0,0 +1,130 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from news.models import Comment, News
+
+User = get_user_model()
+
+WORDS = (
+    'город', 'жители', 'новый', 'парк', 'мост', 'открытие', 'школа',
+    'погода', 'дождь', 'солнце', 'выставка', 'музей', 'концерт', 'театр',
+    'дорога', 'ремонт', 'автобус', 'метро', 'праздник', 'футбол', 'матч',
+    'победа', 'команда', 'рынок', 'цены', 'урожай', 'библиотека', 'книга',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, новостями и комментариями '
+        'для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1_000)
+        parser.add_argument(
+            '--comments', type=int, default=20,
+            help='Среднее число комментариев на новость.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Общий пароль созданных пользователей.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            users = self.create_users(
+                options['users'], options['password'], batch_size
+            )
+            news = self.create_news(rng, options['news'], batch_size)
+            comments = self.create_comments(
+                rng, news, users, options['comments'], batch_size
+            )
+            # bulk_create не отправляет сигналы, пересчитываем счётчики.
+            # Новые новости идут подряд после уже существующих: фильтр
+            # по первому ключу, а не по списку всех ключей, который
+            # упирается в предел числа параметров SQLite.
+            counts = Comment.objects.filter(
+                news=OuterRef('pk'), status=Comment.Status.PUBLISHED
+            ).order_by().values('news').annotate(
+                total=Count('pk')
+            ).values('total')
+            if news:
+                News.objects.filter(pk__gte=min(news)).update(
+                    comment_count=Coalesce(Subquery(counts), 0)
+                )
+        self.stdout.write(
+            f'Создано: пользователей {len(users)}, новостей {len(news)}, '
+            f'комментариев {comments}.'
+        )
+
+    def create_users(self, count, password, batch_size):
+        # Хешируем пароль один раз: это самая медленная часть.
+        password = make_password(password)
+        last_pk = User.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        User.objects.bulk_create(
+            (
+                User(username=f'load-{last_pk + index}', password=password)
+                for index in range(1, count + 1)
+            ),
+            batch_size=batch_size,
+        )
+        # SQLite не возвращает первичные ключи из bulk_create.
+        return list(User.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True
+        ))
+
+    def create_news(self, rng, count, batch_size):
+        last_pk = News.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        today = date.today()
+        News.objects.bulk_create(
+            (
+                News(
+                    title=self.sentence(rng, 3, 6)[:50],
+                    text=self.sentence(rng, 30, 120),
+                    date=today - timedelta(days=rng.randrange(365)),
+                )
+                for _ in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        return list(News.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True
+        ))
+
+    def create_comments(self, rng, news, users, average, batch_size):
+        if not news or not users:
+            return 0
+        comments = [
+            Comment(
+                news_id=news_pk,
+                author_id=rng.choice(users),
+                text=self.sentence(rng, 5, 40),
+            )
+            for news_pk in news
+            # Обсуждения распределены неравномерно: у немногих новостей
+            # комментариев много, у большинства — единицы.
+            for _ in range(int(rng.expovariate(1 / average)))
+        ] if average else []
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        return len(comments)
+
+    @staticmethod
+    def sentence(rng, shortest, longest):
+        words = rng.choices(WORDS, k=rng.randint(shortest, longest))
+        return ' '.join(words).capitalize() + '.'
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from news.moderation_queue import moderate_batch, purge_finished, queue_stats
+
+
+def run_worker(name, batch_size, poll, once, stop):
+    """Цикл обработчика: пачка за пачкой, при пустой очереди — пауза."""
+    try:
+        while not stop.is_set():
+            if not moderate_batch(name, batch_size):
+                if once:
+                    return
+                stop.wait(poll)
+    finally:
+        # У каждого потока и процесса своё соединение с БД.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает обработчики очереди модерации комментариев '
+        'в потоках или процессах и периодически выводит размер '
+        'очереди и пропускную способность.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Обработчики в отдельных процессах, а не в потоках.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.NEWS_MODERATION_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=10.0,
+            help='Как часто выводить метрики очереди, в секундах.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes']:
+            # Открытое соединение не должно достаться дочерним процессам.
+            connections.close_all()
+            worker_class = multiprocessing.Process
+            stop = multiprocessing.Event()
+        else:
+            worker_class, stop = threading.Thread, threading.Event()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        workers = [
+            worker_class(
+                target=run_worker,
+                args=(
+                    f'{prefix}:{number}', options['batch_size'],
+                    options['poll'], options['once'], stop
+                ),
+                daemon=True,
+            )
+            for number in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(options['stats_interval'] / len(workers))
+                self.report()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+            self.report()
+
+    def report(self):
+        purged = purge_finished()
+        stats = queue_stats()
+        self.stdout.write(
+            f'в очереди: {stats["backlog"]}, '
+            f'самый старый: {stats["oldest_seconds"]:.0f} с, '
+            f'проверено за минуту: {stats["finished_per_minute"]}, '
+            f'удалено старых задач: {purged}'
+        )
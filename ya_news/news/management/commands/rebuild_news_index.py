@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news.search import fts_available, rebuild_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовые индексы новостей и комментариев '
+        'вместе с триггерами. Нужна только после миграций, которые '
+        'пересоздают таблицы: в обычной работе индекс обновляется сам.'
+    )
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Индекс FTS5 доступен только для SQLite.')
+        rebuild_indexes()
+        self.stdout.write('Индексы новостей и комментариев пересобраны.')
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# SQL скопирован из news.search на момент миграции: правки модуля
+# не должны менять то, что делает уже применённая миграция.
+CREATE_INDEXES_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_news_fts USING fts5("
+    "title, text, content=news_news, content_rowid=id, "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS news_news_fts_insert "
+    "AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_news_fts_delete "
+    "AFTER DELETE ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_news_fts_update "
+    "AFTER UPDATE ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_comment_fts USING fts5("
+    "text, content=news_comment, content_rowid=id, "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_insert "
+    "AFTER INSERT ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_delete "
+    "AFTER DELETE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_update "
+    "AFTER UPDATE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "INSERT INTO news_news_fts(news_news_fts) VALUES ('rebuild')",
+    "INSERT INTO news_comment_fts(news_comment_fts) VALUES ('rebuild')",
+)
+DROP_INDEXES_SQL = tuple(
+    statement
+    for fts_table in ('news_news_fts', 'news_comment_fts')
+    for statement in (
+        f'DROP TRIGGER IF EXISTS {fts_table}_insert',
+        f'DROP TRIGGER IF EXISTS {fts_table}_delete',
+        f'DROP TRIGGER IF EXISTS {fts_table}_update',
+        f'DROP TABLE IF EXISTS {fts_table}',
+    )
+)
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_INDEXES_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_INDEXES_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_comment_news_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
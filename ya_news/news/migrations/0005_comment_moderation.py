@@ -0,0 +1,75 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# SQL скопирован из news.search на момент миграции: правки модуля
+# не должны менять то, что делает уже применённая миграция.
+COMMENT_TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_insert "
+    "AFTER INSERT ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_delete "
+    "AFTER DELETE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_update "
+    "AFTER UPDATE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+)
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # SQLite пересоздаёт news_comment при добавлении и удалении поля,
+    # и триггеры индекса удаляются вместе со старой таблицей.
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in COMMENT_TRIGGERS_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_news_comment_fts'),
+    ]
+
+    operations = [
+        # При откате выполняется последней, после удаления поля.
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.CreateModel(
+            name='ModerationTask',
+            fields=[
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='moderation_task', serialize=False, to='news.comment')),
+                ('enqueued', models.DateTimeField(auto_now_add=True)),
+                ('claimed_by', models.CharField(blank=True, max_length=100)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_news_created_id_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'На модерации'), ('published', 'Опубликован'), ('rejected', 'Отклонён')], default='published', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['news', 'created', 'id'], name='comment_published_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationtask',
+            index=models.Index(condition=models.Q(('finished_at__isnull', True)), fields=['enqueued'], name='moderation_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationtask',
+            index=models.Index(fields=['finished_at'], name='moderation_finished_idx'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Триггеры UPDATE срабатывают только на изменение индексируемых колонок.
+UPDATE_TRIGGERS_SQL = (
+    "CREATE TRIGGER news_news_fts_update "
+    "AFTER UPDATE OF title, text ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER news_comment_fts_update "
+    "AFTER UPDATE OF text ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+)
+ANY_UPDATE_TRIGGERS_SQL = (
+    "CREATE TRIGGER news_news_fts_update "
+    "AFTER UPDATE ON news_news BEGIN "
+    "INSERT INTO news_news_fts(news_news_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_news_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER news_comment_fts_update "
+    "AFTER UPDATE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+)
+
+
+def replace_triggers(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for fts_table in ('news_news_fts', 'news_comment_fts'):
+            schema_editor.execute(
+                f'DROP TRIGGER IF EXISTS {fts_table}_update'
+            )
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_comment_moderation'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            replace_triggers(UPDATE_TRIGGERS_SQL),
+            replace_triggers(ANY_UPDATE_TRIGGERS_SQL),
+        ),
+    ]
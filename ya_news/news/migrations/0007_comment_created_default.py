@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# SQL скопирован из news.search на момент миграции: правки модуля
+# не должны менять то, что делает уже применённая миграция.
+COMMENT_TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_insert "
+    "AFTER INSERT ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_delete "
+    "AFTER DELETE ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_comment_fts_update "
+    "AFTER UPDATE OF text ON news_comment BEGIN "
+    "INSERT INTO news_comment_fts(news_comment_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO news_comment_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+)
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # SQLite пересоздаёт news_comment при изменении поля, и триггеры
+    # индекса удаляются вместе со старой таблицей.
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in COMMENT_TRIGGERS_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_fts_update_of_columns'),
+    ]
+
+    operations = [
+        # При откате выполняется последней, после возврата поля.
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -2,12 +2,16 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    # Денормализованный счётчик: обновляется сигналами при создании
+    # и удалении комментариев, чтобы главная не считала их запросом.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ('-date',)
@@ -19,6 +23,12 @@ class News(models.Model):
 
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'На модерации'
+        PUBLISHED = 'published', 'Опубликован'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -28,10 +38,67 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: отложенная запись (news.write_behind) сохраняет
+    # время, когда комментарий отправили, а не когда его записали.
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    # На модерацию попадают комментарии из формы в режиме очереди
+    # (см. news.moderation_queue). Созданные в обход неё — из админки,
+    # фикстур, генератора данных — публикуются сразу.
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PUBLISHED,
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            # Покрывает keyset-пагинацию ветки опубликованных
+            # комментариев новости.
+            models.Index(
+                fields=('news', 'created', 'id'),
+                condition=models.Q(status='published'),
+                name='comment_published_thread_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class ModerationTask(models.Model):
+    """
+    Комментарий в очереди модерации.
+
+    Обработчик забирает пачку задач, отмечая их claimed_by и claimed_at,
+    и завершает их, проставляя finished_at. Задачи, взятые слишком
+    давно, считаются брошенными и достаются другим обработчикам.
+    Завершённые задачи хранятся какое-то время для метрик
+    пропускной способности.
+    """
+    comment = models.OneToOneField(
+        Comment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='moderation_task',
+    )
+    enqueued = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = (
+            # Очередь: незавершённые задачи в порядке поступления.
+            models.Index(
+                fields=('enqueued',),
+                condition=models.Q(finished_at__isnull=True),
+                name='moderation_pending_idx'
+            ),
+            models.Index(
+                fields=('finished_at',), name='moderation_finished_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.comment_id}: {self.claimed_by or "в очереди"}'
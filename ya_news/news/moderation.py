@@ -0,0 +1,85 @@
+"""Поиск запрещённых слов в тексте комментариев."""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Латинские буквы и цифры, которыми подменяют похожие кириллические.
+HOMOGLYPHS = str.maketrans({
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', 'ё': 'е',
+    '0': 'о', '3': 'з', '6': 'б',
+})
+# Для каждой буквы все символы, которые выдают себя за неё.
+VARIANTS = {}
+for source, target in HOMOGLYPHS.items():
+    VARIANTS.setdefault(target, {target}).add(chr(source))
+
+
+def normalize(text):
+    """Приводим текст к нижнему регистру и заменяем омоглифы."""
+    return text.lower().translate(HOMOGLYPHS)
+
+
+def char_pattern(char):
+    """Символ слова вместе со всеми его омоглифами."""
+    variants = VARIANTS.get(char)
+    if not variants:
+        return re.escape(char)
+    return '[' + ''.join(sorted(map(re.escape, variants))) + ']'
+
+
+class TrieRegexMatcher:
+    """
+    Одно регулярное выражение, собранное из префиксного дерева слов.
+
+    Общие префиксы слов не дублируются в выражении, поэтому на каждой
+    позиции текста проверяется не больше символов, чем длина самого
+    длинного слова. Омоглифы и регистр учитываются самим выражением,
+    так что текст комментария не приходится нормализовать. Слово
+    должно начинаться на границе слова, но может продолжаться
+    окончанием: «негодяйка» тоже совпадёт.
+    """
+
+    def __init__(self, words):
+        trie = {}
+        for word in filter(None, map(normalize, words)):
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        regex = self._to_regex(trie) if trie else '(?!)'
+        self.pattern = re.compile(r'(?<!\w)' + regex, re.IGNORECASE)
+
+    def _to_regex(self, node):
+        # Раз окончание слова не проверяется, более длинные слова
+        # с тем же началом уже ничего не добавляют.
+        if '' in node:
+            return ''
+        branches = [
+            char_pattern(char) + self._to_regex(child)
+            for char, child in sorted(node.items())
+        ]
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    def search(self, text):
+        """Возвращаем True, если в тексте есть запрещённое слово."""
+        return self.pattern.search(text) is not None
+
+
+@lru_cache(maxsize=1)
+def _build_matcher(matcher_path, words):
+    return import_string(matcher_path)(words)
+
+
+def get_matcher(words):
+    """
+    Матчер для списка слов, один на процесс.
+
+    Собирается заново, только если изменился список слов
+    или класс матчера в настройке BAD_WORDS_MATCHER.
+    """
+    return _build_matcher(settings.BAD_WORDS_MATCHER, tuple(words))
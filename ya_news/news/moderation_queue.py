@@ -0,0 +1,188 @@
+"""
+Очередь модерации комментариев в таблице ModerationTask.
+
+В режиме NEWS_COMMENT_MODERATION = 'queue' комментарий из формы
+сохраняется неопубликованным и ставится в очередь, а обработчики
+(manage.py moderate_comments) проверяют их пачками и публикуют.
+Счётчик comment_count и кеш страниц меняются, только когда
+комментарий становится видимым или перестаёт им быть.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .cache import HOME_PAGE, bump_news_version, expire_page
+from .forms import has_bad_words
+from .models import Comment, ModerationTask, News
+
+PUBLISHED = Comment.Status.PUBLISHED
+# Окно, за которое считается пропускная способность.
+THROUGHPUT_WINDOW = timedelta(minutes=1)
+
+
+def queue_enabled():
+    return settings.NEWS_COMMENT_MODERATION == 'queue'
+
+
+def submit(comment):
+    """
+    Сохраняем комментарий неопубликованным и ставим его в очередь.
+
+    Подходит и для нового, и для отредактированного комментария:
+    изменённый текст проверяется заново, а до проверки комментарий
+    скрыт.
+    """
+    with transaction.atomic():
+        if comment.pk is None:
+            comment.status = Comment.Status.PENDING
+            comment.save()
+            ModerationTask.objects.create(comment=comment)
+            return
+        if comment.status == PUBLISHED:
+            change_comment_counts(Counter((comment.news_id,)), -1)
+        comment.status = Comment.Status.PENDING
+        comment.save()
+        ModerationTask.objects.update_or_create(
+            comment=comment,
+            defaults={
+                'enqueued': timezone.now(),
+                'claimed_by': '',
+                'claimed_at': None,
+                'finished_at': None,
+            },
+        )
+
+
+def claim_batch(worker, size):
+    """
+    Забираем до size задач и возвращаем их id и время захвата.
+
+    Задачи, которые кто-то взял больше NEWS_MODERATION_CLAIM_TIMEOUT
+    секунд назад и не завершил, считаются брошенными. SQLite
+    не поддерживает SELECT ... FOR UPDATE, поэтому задача захватывается
+    UPDATE с тем же условием, что и при выборке: если её успел забрать
+    другой обработчик, UPDATE её не изменит и в результат она не попадёт.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.NEWS_MODERATION_CLAIM_TIMEOUT)
+    claimable = ModerationTask.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale),
+        finished_at__isnull=True,
+    )
+    ids = list(
+        claimable.order_by('enqueued').values_list('pk', flat=True)[:size]
+    )
+    if not ids:
+        return [], now
+    claimable.filter(pk__in=ids).update(claimed_by=worker, claimed_at=now)
+    return list(
+        ModerationTask.objects.filter(
+            pk__in=ids, claimed_by=worker, claimed_at=now
+        ).order_by('enqueued').values_list('pk', flat=True)
+    ), now
+
+
+def moderate_batch(worker, size=None):
+    """
+    Проверяем пачку комментариев из очереди. Возвращаем её размер.
+
+    Тексты проверяются вне транзакции, а итог записывается в одной:
+    комментарии, которые за это время отредактировали или отдали
+    другому обработчику, пропускаются — их проверят заново.
+    """
+    ids, claimed_at = claim_batch(
+        worker, size or settings.NEWS_MODERATION_BATCH_SIZE
+    )
+    if not ids:
+        return 0
+    verdicts = {
+        comment.pk: (comment.news_id, not has_bad_words(comment.text))
+        for comment in Comment.objects.filter(pk__in=ids).only(
+            'pk', 'news_id', 'text'
+        )
+    }
+    with transaction.atomic():
+        still_ours = ModerationTask.objects.filter(
+            pk__in=ids, claimed_by=worker, claimed_at=claimed_at,
+            finished_at__isnull=True,
+        ).values_list('pk', flat=True)
+        published, rejected = [], []
+        for pk in still_ours:
+            if pk in verdicts:
+                (published if verdicts[pk][1] else rejected).append(pk)
+        Comment.objects.filter(pk__in=published).update(status=PUBLISHED)
+        Comment.objects.filter(pk__in=rejected).update(
+            status=Comment.Status.REJECTED
+        )
+        ModerationTask.objects.filter(pk__in=published + rejected).update(
+            finished_at=timezone.now()
+        )
+        change_comment_counts(
+            Counter(verdicts[pk][0] for pk in published), 1
+        )
+    return len(ids)
+
+
+def change_comment_counts(counts, sign):
+    """Меняем comment_count новостей и сбрасываем их кеш после коммита."""
+    for news_id, count in counts.items():
+        News.objects.filter(pk=news_id).update(
+            comment_count=F('comment_count') + sign * count
+        )
+    if counts:
+        transaction.on_commit(lambda: _expire_pages(counts))
+
+
+def _expire_pages(news_ids):
+    for news_id in news_ids:
+        bump_news_version(news_id)
+    expire_page(HOME_PAGE)
+
+
+def purge_finished():
+    """Удаляем завершённые задачи старше NEWS_MODERATION_KEEP_FINISHED."""
+    return ModerationTask.objects.filter(
+        finished_at__lt=timezone.now() - timedelta(
+            seconds=settings.NEWS_MODERATION_KEEP_FINISHED
+        )
+    ).delete()[0]
+
+
+def queue_stats():
+    """Размер очереди, возраст самой старой задачи и пропускная способность."""
+    now = timezone.now()
+    pending = ModerationTask.objects.filter(finished_at__isnull=True)
+    oldest = pending.aggregate(oldest=Min('enqueued'))['oldest']
+    return {
+        'backlog': pending.count(),
+        'oldest_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'finished_per_minute': ModerationTask.objects.filter(
+            finished_at__gte=now - THROUGHPUT_WINDOW
+        ).count(),
+    }
+
+
+def collect_metrics():
+    """Метрики очереди для yacommon.metrics из общей для процессов БД."""
+    stats = queue_stats()
+    return (
+        (
+            'news_moderation_backlog',
+            'Комментарии, ожидающие модерации.',
+            stats['backlog'],
+        ),
+        (
+            'news_moderation_oldest_seconds',
+            'Сколько ждёт самый старый комментарий в очереди.',
+            stats['oldest_seconds'],
+        ),
+        (
+            'news_moderation_finished_per_minute',
+            'Комментарии, проверенные за последнюю минуту.',
+            stats['finished_per_minute'],
+        ),
+    )
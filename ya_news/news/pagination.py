@@ -0,0 +1,54 @@
+"""Keyset-пагинация ветки комментариев по паре (created, id)."""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+from .models import Comment
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(comment):
+    """Курсор на комментарий: микросекунды от эпохи и id."""
+    return f'{(comment.created - EPOCH) // MICROSECOND}-{comment.pk}'
+
+
+def decode_cursor(cursor):
+    """Разбираем курсор, на мусор во входных данных отвечаем 400."""
+    try:
+        micros, pk = map(int, cursor.split('-'))
+        return EPOCH + micros * MICROSECOND, pk
+    except (ValueError, OverflowError):
+        raise BadRequest('Некорректный курсор.')
+
+
+def get_comments_page(news_id, cursor=None, page_size=None):
+    """
+    Возвращаем страницу комментариев и курсор следующей страницы.
+
+    Запрос всегда начинается с позиции курсора по частичному индексу
+    опубликованных комментариев (news, created, id), поэтому глубина
+    ветки не влияет на его цену.
+    """
+    page_size = page_size or settings.COMMENTS_COUNT_ON_DETAIL_PAGE
+    queryset = Comment.objects.filter(
+        news_id=news_id, status=Comment.Status.PUBLISHED
+    )
+    if cursor:
+        created, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    comments = list(
+        queryset.select_related('author').order_by(
+            'created', 'pk'
+        )[:page_size + 1]
+    )
+    next_cursor = None
+    if len(comments) > page_size:
+        comments = comments[:page_size]
+        next_cursor = encode_cursor(comments[-1])
+    return comments, next_cursor
@@ -1,12 +1,105 @@
+import json
+import os
+from contextlib import contextmanager
+from copy import deepcopy
 from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
 from django.urls import reverse
 import pytest
+from pytest_django.fixtures import validate_django_db
 
 # Импортируем класс клиента.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 
 # Импортируем модель новости, чтобы создать экземпляр.
 from news.models import News, Comment
+from yacommon.auth import clear_user_cache
+
+User = get_user_model()
+
+TRANSACTIONAL_FIXTURES = {
+    'transactional_db', 'live_server', 'django_db_reset_sequences'
+}
+
+
+def pytest_runtest_setup(item):
+    """
+    Транзакционные тесты запрещены.
+
+    Они очищают БД через flush и стёрли бы общие данные
+    из django_db_setup для всех следующих тестов.
+    """
+    marker = item.get_closest_marker('django_db')
+    transactional, reset_sequences, *_ = (
+        validate_django_db(marker) if marker else (False, False)
+    )
+    if transactional or reset_sequences or TRANSACTIONAL_FIXTURES & set(
+        item.fixturenames
+    ):
+        pytest.fail(
+            f'{item.nodeid}: транзакционный тест стёр бы общие данные '
+            'из django_db_setup, используйте обычный django_db.',
+            pytrace=False
+        )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кеши живут в памяти процесса и не откатываются вместе с БД.
+    yield
+    cache.clear()
+    clear_user_cache()
+
+
+# Базовые числа запросов по страницам и объёмам данных.
+# Перегенерировать: UPDATE_QUERY_BUDGET=1 pytest.
+QUERY_BUDGET_FILE = Path(__file__).with_name('query_budget.json')
+UPDATE_QUERY_BUDGET = bool(os.getenv('UPDATE_QUERY_BUDGET'))
+
+
+@pytest.fixture(scope='session')
+def query_budget_baseline():
+    baseline = {}
+    if QUERY_BUDGET_FILE.exists():
+        baseline = json.loads(QUERY_BUDGET_FILE.read_text(encoding='utf-8'))
+    yield baseline
+    if UPDATE_QUERY_BUDGET:
+        QUERY_BUDGET_FILE.write_text(
+            json.dumps(baseline, ensure_ascii=False, indent=2, sort_keys=True)
+            + '\n',
+            encoding='utf-8'
+        )
+
+
+@pytest.fixture
+def query_budget(query_budget_baseline):
+    """Проверка, что блок укладывается в бюджет запросов из базы."""
+    @contextmanager
+    def check(view, size):
+        with CaptureQueriesContext(connection) as context:
+            yield
+        executed = len(context)
+        budgets = query_budget_baseline.setdefault(view, {})
+        if UPDATE_QUERY_BUDGET:
+            budgets[str(size)] = executed
+            return
+        budget = budgets.get(str(size))
+        assert budget is not None, (
+            f'Нет бюджета для {view} на {size} записях, '
+            'перегенерируйте базу с UPDATE_QUERY_BUDGET=1'
+        )
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        assert executed <= budget, (
+            f'{view} на {size} записях: {executed} запросов '
+            f'при бюджете {budget}:\n{queries}'
+        )
+    return check
 
 
 @pytest.fixture
@@ -19,50 +112,98 @@ def news_detail_url(news):
     return reverse('news:detail', kwargs={'pk': news.pk})
 
 
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    Тестовая БД с общими данными набора: аналог setUpTestData.
+
+    Строки создаются один раз сразу после миграций, до первого теста,
+    поэтому их видит любой тест с доступом к БД при любом порядке
+    запуска. Каждый тест идёт в своей транзакции: его изменения
+    откатываются, общие строки остаются. Пользователи логинятся тоже
+    один раз, клиенты получают cookie готовой сессии.
+    """
+    with django_db_blocker.unblock():
+        author = User.objects.create(username='Автор')
+        not_author = User.objects.create(username='Не автор')
+        news = News.objects.create(
+            title='Заголовок', text='Текст новости', date=datetime.today()
+        )
+        news2 = News.objects.create(
+            title='Заголовок 2',
+            text='Текст второй новости',
+            date=datetime.today()
+        )
+        comment = Comment.objects.create(
+            news=news, text='Текст комментария', author=author
+        )
+        comment2 = Comment.objects.create(
+            news=news, text='Текст второго комментария', author=author
+        )
+        # Сигналы увеличили счётчик комментариев в БД.
+        news.refresh_from_db()
+        sessions = {user.pk: login(user) for user in (author, not_author)}
+    # Созданные строки попали и в кеши процесса.
+    cache.clear()
+    clear_user_cache()
+    return SimpleNamespace(
+        author=author, not_author=not_author, news=news, news2=news2,
+        comment=comment, comment2=comment2, sessions=sessions,
+    )
+
+
+@pytest.fixture(scope='session')
+def snapshot(django_db_setup):
+    """Общие данные набора, созданные в django_db_setup."""
+    return django_db_setup
+
+
+def login(user):
+    """Ключ сессии пользователя, вошедшего через force_login."""
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def logged_in_client(snapshot, user):
+    # Новый клиент на каждый тест: выход в одном тесте не должен
+    # разлогинить других. Сессия в БД при этом общая.
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = snapshot.sessions[user.pk]
+    return client
+
+
+# Тесты получают копии общих объектов, как атрибуты из setUpTestData:
+# изменения в памяти не переходят в следующий тест.
+
 @pytest.fixture
-# Используем встроенную фикстуру для модели пользователей django_user_model.
-def author(django_user_model):
-    return django_user_model.objects.create(username='Автор')
+def author(snapshot, db):
+    return deepcopy(snapshot.author)
 
 
 @pytest.fixture
-def not_author(django_user_model):
-    return django_user_model.objects.create(username='Не автор')
+def not_author(snapshot, db):
+    return deepcopy(snapshot.not_author)
 
 
 @pytest.fixture
-def author_client(author):  # Вызываем фикстуру автора.
-    # Создаём новый экземпляр клиента, чтобы не менять глобальный.
-    client = Client()
-    client.force_login(author)  # Логиним автора в клиенте.
-    return client
+def author_client(snapshot, author):
+    return logged_in_client(snapshot, author)
 
 
 @pytest.fixture
-def not_author_client(not_author):
-    client = Client()
-    client.force_login(not_author)  # Логиним обычного пользователя в клиенте.
-    return client
+def not_author_client(snapshot, not_author):
+    return logged_in_client(snapshot, not_author)
 
 
 @pytest.fixture
-def news():
-    news = News.objects.create(  # Создаём объект новости.
-        title='Заголовок',
-        text='Текст новости',
-        date=datetime.today()
-    )
-    return news
+def news(snapshot, db):
+    return deepcopy(snapshot.news)
 
 
 @pytest.fixture
-def news2():
-    news2 = News.objects.create(  # Создаём объект новости.
-        title='Заголовок 2',
-        text='Текст второй новости',
-        date=datetime.today()
-    )
-    return news2
+def news2(snapshot, db):
+    return deepcopy(snapshot.news2)
 
 
 @pytest.fixture
@@ -74,23 +215,13 @@ def id_for_args(news):
 
 
 @pytest.fixture
-def comment(news, author):
-    comment = Comment.objects.create(  # Создаём объект комментария.
-        news=news,
-        text='Текст комментария',
-        author=author
-    )
-    return comment
+def comment(snapshot, db):
+    return deepcopy(snapshot.comment)
 
 
 @pytest.fixture
-def comment2(news, author):
-    comment2 = Comment.objects.create(  # Создаём еще один объект комментария.
-        news=news,
-        text='Текст второго комментария',
-        author=author
-    )
-    return comment2
+def comment2(snapshot, db):
+    return deepcopy(snapshot.comment2)
 
 
 @pytest.fixture
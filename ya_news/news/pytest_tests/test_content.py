@@ -1,9 +1,23 @@
+import asyncio
+from datetime import date
+from http import HTTPStatus
+
 import pytest
 from operator import attrgetter
 
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.urls import resolve, reverse
 
+from news.cache import HOME_PAGE
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.views import (
+    AsyncNewsDetailView, AsyncNewsList, NewsDetail, NewsDetailView,
+    NewsList
+)
 
 
 @pytest.mark.django_db  # Разрешаем доступ к базе данных.
@@ -95,3 +109,191 @@ def test_comment_form_avalibility_for_differenr_users(
     # Если форма должна быть, проверяем её тип
     if form_avalibility:
         assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.mark.django_db
+def test_home_page_does_not_load_comments(
+        client, comment, comment2, news_home_url, django_assert_num_queries
+):
+    # Количество комментариев берётся из счётчика, а не из comment_set.
+    with django_assert_num_queries(1):
+        response = client.get(news_home_url)
+    assert 'Комментариев: 2' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_comments_keyset_pagination(
+        client, settings, news, comment, comment2, news_detail_url
+):
+    # На странице один комментарий, второй доступен по курсору.
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 1
+    response = client.get(news_detail_url)
+    assert response.context['comments'] == [comment]
+    next_cursor = response.context['next_cursor']
+    assert next_cursor
+    url = reverse('news:comments', args=(news.pk,))
+    response = client.get(url, {'after': next_cursor})
+    assert response.context['comments'] == [comment2]
+    # Последняя страница не ссылается на следующую.
+    assert response.context['next_cursor'] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'cursor', ('not-a-cursor', '99999999999999999999-1')
+)
+def test_comments_page_rejects_broken_cursor(client, news, cursor):
+    url = reverse('news:comments', args=(news.pk,))
+    response = client.get(url, {'after': cursor})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_comments_page_of_missing_news_is_not_found(client):
+    response = client.get(reverse('news:comments', args=(999,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_counter_update_does_not_reindex_news(news):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT total_changes()')
+        before, = cursor.fetchone()
+        News.objects.filter(pk=news.pk).update(comment_count=5)
+        cursor.execute('SELECT total_changes()')
+        after, = cursor.fetchone()
+    # Изменилась одна строка новости, триггер индекса не сработал.
+    assert after - before == 1
+
+
+@pytest.mark.django_db
+def test_search_highlights_matches(client, news, news2):
+    news2.text = 'Текст <b>второй</b> новости про погоду'
+    news2.save()
+    response = client.get(reverse('news:search'), {'q': 'погод'})
+    # Индекс обновился при сохранении, а сниппет экранирован.
+    (found, snippet), = response.context['object_list']
+    assert found == news2
+    assert '<mark>погоду</mark>' in snippet
+    assert '&lt;b&gt;второй&lt;/b&gt;' in snippet
+
+
+@pytest.mark.django_db
+def test_search_filters_by_news_date(client, news, news2):
+    news.date = date(2020, 1, 1)
+    news.save()
+    response = client.get(
+        reverse('news:search'), {'q': 'текст', 'date_from': '2021-01-01'}
+    )
+    assert [found for found, _ in response.context['object_list']] == [news2]
+
+
+@pytest.mark.django_db
+def test_search_in_comments(client, comment, comment2):
+    response = client.get(
+        reverse('news:search'), {'q': 'второго', 'comments': 'on'}
+    )
+    assert [
+        found for found, _ in response.context['object_list']
+    ] == [comment2]
+
+
+@pytest.mark.django_db
+def test_anonymous_detail_is_served_from_cache(
+        client, author_client, news, comment, news_detail_url,
+        django_assert_num_queries, form_data
+):
+    first = client.get(news_detail_url)
+    with django_assert_num_queries(0):
+        second = client.get(news_detail_url)
+    assert first.content == second.content
+    # Автор видит ссылки редактирования, хотя ветка уже в кеше.
+    response = author_client.get(news_detail_url)
+    assert reverse('news:edit', args=(comment.pk,)) in (
+        response.content.decode()
+    )
+    # Новый комментарий сбрасывает кеш фрагментов.
+    author_client.post(news_detail_url, data=form_data)
+    assert form_data['text'] in client.get(news_detail_url).content.decode()
+
+
+@pytest.mark.django_db
+def test_comment_added_during_render_is_not_hidden_by_cache(
+        client, author, news, news_detail_url, monkeypatch
+):
+    get_thread_context = NewsDetail.get_thread_context
+
+    def racing(self, news_pk):
+        context = get_thread_context(self, news_pk)
+        # Комментарий добавлен после чтения ветки, но до записи в кеш.
+        Comment.objects.create(news=news, author=author, text='Гонка')
+        return context
+
+    monkeypatch.setattr(NewsDetail, 'get_thread_context', racing)
+    assert 'Гонка' not in client.get(news_detail_url).content.decode()
+    monkeypatch.undo()
+    assert 'Гонка' in client.get(news_detail_url).content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('backend', ('locmem', 'filebased'))
+def test_home_page_cache_for_anonymous(
+        client, news, news_home_url, django_assert_num_queries,
+        settings, tmp_path, backend
+):
+    if backend == 'filebased':
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tmp_path,
+        }}
+    client.get(news_home_url)
+    with django_assert_num_queries(0):
+        client.get(news_home_url)
+    # Сохранение новости делает кеш устаревшим, первый запрос
+    # берёт блокировку и рендерит страницу заново.
+    news.title = 'Новый заголовок'
+    news.save()
+    assert 'Новый заголовок' in client.get(news_home_url).content.decode()
+
+
+@pytest.mark.django_db
+def test_stale_home_page_is_served_while_locked(
+        client, news, news_home_url, django_assert_num_queries
+):
+    client.get(news_home_url)
+    news.title = 'Новый заголовок'
+    news.save()
+    # Пока другой процесс держит блокировку, отдаётся старая копия.
+    cache.add(f'{HOME_PAGE}:lock', True)
+    with django_assert_num_queries(0):
+        response = client.get(news_home_url)
+    assert 'Новый заголовок' not in response.content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'sync_view, async_view, url',
+    (
+        (NewsList, AsyncNewsList, pytest.lazy_fixture('news_home_url')),
+        (
+            NewsDetailView, AsyncNewsDetailView,
+            pytest.lazy_fixture('news_detail_url')
+        ),
+    )
+)
+def test_async_views_render_same_page(
+        rf, comment, sync_view, async_view, url, django_assert_num_queries
+):
+    kwargs = resolve(url).kwargs
+    request = rf.get(url, HTTP_HOST='localhost')
+    request.user = AnonymousUser()
+    expected = sync_view.as_view()(request, **kwargs)
+    if hasattr(expected, 'render'):
+        expected.render()
+    cache.clear()
+    assert asyncio.iscoroutinefunction(async_view.as_view())
+    view = async_to_sync(async_view.as_view())
+    assert view(request, **kwargs).content == expected.content
+    # Повторный запрос анонима отдаётся из кеша без обращения к БД.
+    with django_assert_num_queries(0):
+        assert view(request, **kwargs).content == expected.content
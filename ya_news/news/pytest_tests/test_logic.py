@@ -1,12 +1,17 @@
+import os
 from http import HTTPStatus
 
 import pytest
 from pytest_django.asserts import assertFormError, assertRedirects
 
+from django.db import connection
+from django.db.models import QuerySet
 from django.urls import reverse
 
 from news.forms import BAD_WORDS, WARNING
 from news.models import Comment, News
+from news import write_behind
+from news.moderation_queue import claim_batch, moderate_batch, queue_stats
 
 
 @pytest.mark.django_db  # Разрешаем доступ к базе данных.
@@ -105,3 +110,255 @@ def test_other_user_cant_delete_note(not_author_client, pk_for_args):
     response = not_author_client.post(url)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert Comment.objects.count() == initial_news_count
+
+
+def test_comment_count_follows_comments(author_client, news2, form_data):
+    # У второй новости из общих данных комментариев нет.
+    url = reverse('news:detail', kwargs={'pk': news2.pk})
+    author_client.post(url, data=form_data)
+    # Счётчик в новости увеличился вместе с созданием комментария.
+    news2.refresh_from_db()
+    assert news2.comment_count == 1
+    comment = Comment.objects.get(news=news2)
+    author_client.post(reverse('news:delete', args=(comment.pk,)))
+    # После удаления комментария счётчик снова равен нулю.
+    news2.refresh_from_db()
+    assert news2.comment_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('text', ('РЕДИСКА', 'ты нeгoдяй!', 'peдиска'))
+def test_bad_words_with_homoglyphs(author_client, news, form_data, text):
+    url = reverse('news:detail', kwargs={'pk': news.pk})
+    # Регистр и латинские двойники не помогают обойти фильтр.
+    form_data['text'] = text
+    comments_before = Comment.objects.count()
+    response = author_client.post(url, data=form_data)
+    assertFormError(response, 'form', 'text', errors=(WARNING))
+    assert Comment.objects.count() == comments_before
+
+
+@pytest.mark.django_db
+def test_shared_data_is_visible_without_fixtures():
+    # Общие строки создаются в django_db_setup, до первого теста,
+    # поэтому их видно независимо от порядка запуска.
+    assert News.objects.count() == 2
+    assert Comment.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_sqlite_profile_is_applied_on_connect():
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        # 1 — NORMAL.
+        assert cursor.fetchone()[0] == 1
+    assert connection.transaction_mode == 'IMMEDIATE'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'name, args, expected_queries',
+    (
+        # Сессия, пользователь, новость, INSERT и счётчик комментариев.
+        ('news:detail', pytest.lazy_fixture('id_for_args'), 5),
+        # Сессия, пользователь, комментарий вместе с новостью и UPDATE.
+        ('news:edit', pytest.lazy_fixture('pk_for_args'), 4),
+        # Сессия, пользователь, комментарий, каскадный DELETE задачи
+        # модерации, DELETE и счётчик комментариев.
+        ('news:delete', pytest.lazy_fixture('pk_for_args'), 6),
+    )
+)
+def test_comment_writes_load_each_object_once(
+        author_client, form_data, name, args, expected_queries,
+        django_assert_num_queries
+):
+    url = reverse(name, args=args)
+    with django_assert_num_queries(expected_queries):
+        response = author_client.post(url, data=form_data)
+    assert response.status_code == HTTPStatus.FOUND
+
+
+@pytest.mark.django_db
+def test_queue_mode_publishes_after_moderation(
+        author_client, news2, form_data, settings
+):
+    settings.NEWS_COMMENT_MODERATION = 'queue'
+    url = reverse('news:detail', args=(news2.pk,))
+    author_client.post(url, data=form_data)
+    comment = Comment.objects.get(news=news2)
+    # До проверки комментарий не виден и не учтён в счётчике.
+    assert comment.status == Comment.Status.PENDING
+    assert comment.text not in author_client.get(url).content.decode()
+    assert queue_stats()['backlog'] == 1
+    assert moderate_batch('worker') == 1
+    comment.refresh_from_db()
+    news2.refresh_from_db()
+    assert comment.status == Comment.Status.PUBLISHED
+    assert news2.comment_count == 1
+    assert comment.text in author_client.get(url).content.decode()
+    assert queue_stats() == {
+        'backlog': 0, 'oldest_seconds': 0, 'finished_per_minute': 1
+    }
+
+
+@pytest.mark.django_db
+def test_queue_mode_rejects_bad_words(
+        author_client, news2, form_data, settings
+):
+    settings.NEWS_COMMENT_MODERATION = 'queue'
+    form_data['text'] = f'Какой-то текст, {BAD_WORDS[0]}, еще текст'
+    url = reverse('news:detail', args=(news2.pk,))
+    # Форма не проверяет текст, это делает обработчик очереди.
+    response = author_client.post(url, data=form_data)
+    assertRedirects(response, f'{url}#comments')
+    moderate_batch('worker')
+    comment = Comment.objects.get(news=news2)
+    news2.refresh_from_db()
+    assert comment.status == Comment.Status.REJECTED
+    assert news2.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_queue_mode_rechecks_edited_comment(
+        author_client, news, comment, form_data, settings
+):
+    settings.NEWS_COMMENT_MODERATION = 'queue'
+    author_client.post(reverse('news:edit', args=(comment.pk,)), form_data)
+    comment.refresh_from_db()
+    news.refresh_from_db()
+    # Исправленный текст скрыт до проверки и не учитывается в счётчике.
+    assert comment.status == Comment.Status.PENDING
+    assert news.comment_count == 1
+    moderate_batch('worker')
+    news.refresh_from_db()
+    assert news.comment_count == 2
+
+
+@pytest.mark.django_db
+def test_claimed_tasks_go_to_one_worker(
+        author_client, news2, form_data, settings
+):
+    settings.NEWS_COMMENT_MODERATION = 'queue'
+    author_client.post(
+        reverse('news:detail', args=(news2.pk,)), data=form_data
+    )
+    ids, _ = claim_batch('first', 10)
+    assert len(ids) == 1
+    assert claim_batch('second', 10)[0] == []
+    # Задачу, брошенную дольше NEWS_MODERATION_CLAIM_TIMEOUT,
+    # забирает другой обработчик.
+    settings.NEWS_MODERATION_CLAIM_TIMEOUT = -1
+    assert claim_batch('second', 10)[0] == ids
+
+
+@pytest.mark.django_db
+def test_interleaved_claims_never_share_tasks(
+        author_client, news2, form_data, settings, monkeypatch
+):
+    settings.NEWS_COMMENT_MODERATION = 'queue'
+    url = reverse('news:detail', args=(news2.pk,))
+    for _ in range(3):
+        author_client.post(url, data=form_data)
+    claimed = {}
+    update = QuerySet.update
+
+    def update_after_rival(queryset, **kwargs):
+        # Второй обработчик забирает задачи между выборкой и UPDATE
+        # первого.
+        if kwargs.get('claimed_by') == 'first' and 'second' not in claimed:
+            claimed['second'] = claim_batch('second', 10)[0]
+        return update(queryset, **kwargs)
+
+    monkeypatch.setattr(QuerySet, 'update', update_after_rival)
+    claimed['first'] = claim_batch('first', 10)[0]
+    assert len(claimed['second']) == 3
+    assert claimed['first'] == []
+
+
+@pytest.fixture
+def comment_buffer(settings, monkeypatch):
+    # Без фонового потока: буфер записывается только вызовом flush().
+    settings.NEWS_COMMENT_WRITE_BEHIND = True
+    settings.NEWS_WRITE_BEHIND_INTERVAL = None
+    settings.NEWS_WRITE_BEHIND_SPOOL_DIR = None
+    buffer = write_behind.CommentBuffer()
+    monkeypatch.setattr(write_behind, 'comment_buffer', buffer)
+    yield buffer
+    # Незаписанное откатилось бы вместе с тестом, а при выходе
+    # из процесса базы уже нет.
+    buffer.items.clear()
+
+
+@pytest.mark.django_db
+def test_write_behind_shows_comment_to_author_first(
+        author_client, not_author_client, news2, form_data, comment_buffer
+):
+    url = reverse('news:detail', args=(news2.pk,))
+    author_client.post(url, data=form_data)
+    assert not Comment.objects.filter(news=news2).exists()
+    # Автор видит свой комментарий сразу, остальные — после записи.
+    assert form_data['text'] in author_client.get(url).content.decode()
+    assert form_data['text'] not in not_author_client.get(url).content.decode()
+    assert comment_buffer.flush() == 1
+    news2.refresh_from_db()
+    assert news2.comment_count == 1
+    assert form_data['text'] in not_author_client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_full_write_behind_buffer_writes_in_request(
+        author_client, news2, form_data, comment_buffer, settings
+):
+    settings.NEWS_WRITE_BEHIND_MAX_SIZE = 0
+    author_client.post(
+        reverse('news:detail', args=(news2.pk,)), data=form_data
+    )
+    assert Comment.objects.filter(news=news2).exists()
+
+
+@pytest.mark.django_db
+def test_write_behind_spool_survives_restart(
+        author_client, news2, form_data, comment_buffer, settings, tmp_path
+):
+    settings.NEWS_WRITE_BEHIND_SPOOL_DIR = str(tmp_path)
+    author_client.post(
+        reverse('news:detail', args=(news2.pk,)), data=form_data
+    )
+    [buffered] = comment_buffer.items
+    # Процесс упал: блокировка снята, файлы остались под его pid.
+    comment_buffer.spool.close()
+    comment_buffer.spool_lock.close()
+    own = tmp_path / str(os.getpid())
+    for suffix in ('.lock', '.ndjson'):
+        own.with_suffix(suffix).rename(tmp_path / f'1{suffix}')
+    # Новый процесс забирает файлы упавшего.
+    restarted = write_behind.CommentBuffer()
+    assert restarted.flush() == 1
+    comment = Comment.objects.get(news=news2)
+    assert (comment.text, comment.created) == (
+        form_data['text'], buffered.created
+    )
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f'{os.getpid()}.lock', f'{os.getpid()}.ndjson'
+    ]
+    assert own.with_suffix('.ndjson').read_text() == ''
+    restarted.spool.close()
+    restarted.spool_lock.close()
+
+
+@pytest.mark.django_db
+def test_write_behind_drops_comments_of_deleted_news(
+        author_client, news, news2, form_data, comment_buffer, caplog
+):
+    for target in (news, news2):
+        author_client.post(
+            reverse('news:detail', args=(target.pk,)), data=form_data
+        )
+    initial_count = Comment.objects.count()
+    deleted_pk = news2.pk
+    news2.delete()
+    # Комментарий к удалённой новости не мешает записать остальные.
+    assert comment_buffer.flush() == 1
+    assert not comment_buffer.items
+    assert Comment.objects.count() == initial_count + 1
+    assert f'новости {deleted_pk}' in caplog.text
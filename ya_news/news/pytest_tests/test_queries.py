@@ -0,0 +1,77 @@
+from datetime import datetime
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from news.models import Comment, News
+
+# Объёмы данных, на которых снимается число запросов.
+SIZES = (1, 10, 100)
+
+
+@pytest.fixture
+def feed(request, django_user_model):
+    """Новости и комментарии разных авторов к первой из них."""
+    size = request.param
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст', date=datetime.today())
+        for index in range(size)
+    )
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'Читатель {index}')
+        for index in range(size)
+    )
+    news = News.objects.order_by('pk').first()
+    Comment.objects.bulk_create(
+        Comment(news=news, author=user, text='Текст комментария')
+        for user in django_user_model.objects.all()
+    )
+    return size, news
+
+
+PAGES = (
+    # Имя страницы, клиент, аргументы адреса, GET-параметры.
+    ('news:home', pytest.lazy_fixture('client'), False, {}),
+    ('news:detail', pytest.lazy_fixture('author_client'), True, {}),
+    ('news:comments', pytest.lazy_fixture('client'), True, {}),
+    ('news:search', pytest.lazy_fixture('client'), False, {'q': 'Текст'}),
+)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('feed', SIZES, indirect=True)
+@pytest.mark.parametrize('name, user_client, with_pk, params', PAGES)
+def test_pages_fit_query_budget(
+        feed, name, user_client, with_pk, params, query_budget
+):
+    size, news = feed
+    url = reverse(name, args=(news.pk,) if with_pk else None)
+    with query_budget(name, size):
+        user_client.get(url, params)
+
+
+def test_query_budget_does_not_grow_with_data(query_budget_baseline):
+    # На малых объёмах страница может быть неполной и обходиться
+    # дешевле, поэтому сравниваем два самых больших объёма.
+    for name, budgets in query_budget_baseline.items():
+        *_, smaller, larger = (budgets[str(size)] for size in SIZES)
+        assert smaller == larger, (
+            f'Число запросов {name} зависит от объёма данных: {budgets}'
+        )
+
+
+@pytest.mark.django_db
+def test_bench_home_page_measures_both_views():
+    out = StringIO()
+    call_command('bench_home_page', sizes=[2], stdout=out)
+    rows = out.getvalue().splitlines()[1:]
+    assert [row.split()[:2] for row in rows] == [
+        ['2', 'legacy'], ['2', 'counter']
+    ]
+    # Обе строки — настоящий рендер, а не страница из кеша.
+    legacy_queries, counter_queries = (int(row.split()[2]) for row in rows)
+    assert counter_queries > 0
+    assert legacy_queries > counter_queries
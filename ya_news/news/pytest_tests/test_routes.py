@@ -5,6 +5,8 @@ from pytest_django.asserts import assertRedirects
 
 from django.urls import reverse
 
+from yacommon.metrics import registry
+
 
 @pytest.mark.django_db  # Разрешаем доступ к базе данных.
 @pytest.mark.parametrize(
@@ -64,3 +66,22 @@ def test_redirects(client, name, args):
     expected_url = f'{login_url}?next={url}'
     response = client.get(url)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.django_db
+def test_metrics_are_exported_for_local_clients(
+        client, news_detail_url, settings, caplog
+):
+    settings.METRICS_ENABLED = True
+    # Любой повтор запроса считается N+1, чтобы проверить предупреждение.
+    settings.METRICS_N_PLUS_ONE_THRESHOLD = 0
+    registry.reset()
+    client.get(news_detail_url)
+    assert 'Возможный N+1 в news:detail' in caplog.text
+    response = client.get(reverse('metrics'))
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode()
+    assert 'django_view_requests_total{view="news:detail"} 1' in content
+    assert 'news_moderation_backlog 0' in content
+    response = client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,248 @@
+"""Полнотекстовый поиск по новостям и комментариям на SQLite FTS5."""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.text import Truncator
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+
+# Маркеры совпадений в сниппетах: не встречаются в обычном тексте
+# и переживают экранирование HTML.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+
+def _triggers(table, fts_table, columns):
+    """
+    Триггеры, обновляющие индекс при записи в table.
+
+    Триггер UPDATE срабатывает только на изменение индексируемых
+    колонок: обновления comment_count или статуса комментария
+    индекс не трогают.
+    """
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {names}) "
+        f"VALUES ('delete', old.id, {old});"
+    )
+    insert = (
+        f'INSERT INTO {fts_table}(rowid, {names}) VALUES (new.id, {new});'
+    )
+    return (
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_insert '
+        f'AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_delete '
+        f'AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts_table}_update '
+        f'AFTER UPDATE OF {names} ON {table} '
+        f'BEGIN {delete} {insert} END',
+    )
+
+
+INDEXES = {
+    # Таблица индекса: (индексируемая таблица, колонки).
+    'news_news_fts': ('news_news', ('title', 'text')),
+    'news_comment_fts': ('news_comment', ('text',)),
+}
+WORD = re.compile(r'\w+')
+
+
+def fts_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def create_indexes(cursor):
+    """
+    Создаём таблицы индексов и триггеры синхронизации.
+
+    Индекс обновляется триггерами на каждую запись, так что полная
+    пересборка нужна только после миграций, пересоздающих таблицы.
+    """
+    for fts_table, (table, columns) in INDEXES.items():
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5('
+            f'{", ".join(columns)}, content={table}, content_rowid=id, '
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        for statement in _triggers(table, fts_table, columns):
+            cursor.execute(statement)
+
+
+def drop_indexes(cursor):
+    for fts_table in INDEXES:
+        for action in ('insert', 'delete', 'update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{action}')
+        cursor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+
+
+def rebuild_indexes():
+    with connection.cursor() as cursor:
+        # Триггеры пересоздаются, чтобы подхватить их текущее определение.
+        for fts_table in INDEXES:
+            for action in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{action}')
+        create_indexes(cursor)
+        for fts_table in INDEXES:
+            cursor.execute(
+                f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"
+            )
+
+
+def build_match(query):
+    """Каждое слово запроса ищется как префикс, синтаксис FTS5 скрыт."""
+    words = WORD.findall(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet):
+    """Экранируем сниппет и подсвечиваем совпадения тегом mark."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """
+    Результаты поиска в порядке релевантности (bm25).
+
+    Ведёт себя как последовательность, поэтому подходит Paginator:
+    len() выполняет COUNT по индексу, срез — выборку одной страницы
+    со сниппетами. Элементы — пары (объект, сниппет).
+    """
+    model = None
+    fts_table = None
+    join = ''
+    date_column = None
+
+    def __init__(self, query, date_from=None, date_to=None):
+        self.match = build_match(query)
+        self.where = [f'{self.fts_table} MATCH %s']
+        self.params = [self.match]
+        # Таблицы самих объектов нужны только для фильтра по дате.
+        if not (date_from or date_to):
+            self.join = ''
+        if date_from:
+            self.where.append(f'{self.date_column} >= %s')
+            self.params.append(date_from.isoformat())
+        if date_to:
+            self.where.append(f'{self.date_column} <= %s')
+            self.params.append(date_to.isoformat())
+
+    def _execute(self, select, suffix='', params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {select} FROM {self.fts_table} {self.join} '
+                f'WHERE {" AND ".join(self.where)} {suffix}',
+                (*self.params, *params)
+            )
+            return cursor.fetchall()
+
+    def __len__(self):
+        if self.match is None:
+            return 0
+        return self._execute('count(*)')[0][0]
+
+    def __getitem__(self, page):
+        if self.match is None:
+            return []
+        rows = self._execute(
+            f'{self.fts_table}.rowid, snippet({self.fts_table}, -1, '
+            f"'{MARK_START}', '{MARK_END}', '…', {SNIPPET_TOKENS})",
+            f'ORDER BY bm25({self.fts_table}) LIMIT %s OFFSET %s',
+            (page.stop - page.start, page.start)
+        )
+        objects = self.get_objects([pk for pk, _ in rows])
+        return [
+            (objects[pk], highlight(snippet))
+            for pk, snippet in rows if pk in objects
+        ]
+
+    def get_objects(self, ids):
+        return self.model.objects.in_bulk(ids)
+
+
+class NewsSearchResults(SearchResults):
+    model = News
+    fts_table = 'news_news_fts'
+    join = 'JOIN news_news ON news_news.id = news_news_fts.rowid'
+    date_column = 'news_news.date'
+
+
+class CommentSearchResults(SearchResults):
+    model = Comment
+    fts_table = 'news_comment_fts'
+    join = (
+        'JOIN news_comment ON news_comment.id = news_comment_fts.rowid '
+        'JOIN news_news ON news_news.id = news_comment.news_id'
+    )
+    date_column = 'news_news.date'
+
+    def __init__(self, query, date_from=None, date_to=None):
+        super().__init__(query, date_from, date_to)
+        # Индекс содержит и неопубликованные комментарии, поэтому
+        # таблица комментариев нужна всегда.
+        if not self.join:
+            self.join = (
+                'JOIN news_comment ON news_comment.id = news_comment_fts.rowid'
+            )
+        self.where.append('news_comment.status = %s')
+        self.params.append(Comment.Status.PUBLISHED)
+
+    def get_objects(self, ids):
+        return self.model.objects.select_related('news', 'author').in_bulk(
+            ids
+        )
+
+
+class LikeSearchResults:
+    """Поиск через icontains для баз без FTS5, без подсветки."""
+
+    def __init__(self, queryset, fields, query):
+        for word in WORD.findall(query):
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        self.queryset = queryset if WORD.search(query) else queryset.none()
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __getitem__(self, page):
+        return [
+            (obj, Truncator(obj.text).words(SNIPPET_TOKENS))
+            for obj in self.queryset[page]
+        ]
+
+
+def search(q, date_from=None, date_to=None, comments=False):
+    """
+    Ищем по запросу q новости или, если comments, комментарии к ним.
+
+    Аргументы совпадают с полями SearchForm.
+    """
+    if fts_available():
+        results_class = CommentSearchResults if comments else NewsSearchResults
+        return results_class(q, date_from, date_to)
+    if comments:
+        queryset = Comment.objects.filter(
+            status=Comment.Status.PUBLISHED
+        ).select_related('news', 'author')
+        fields, date_field = ('text',), 'news__date'
+    else:
+        queryset = News.objects.all()
+        fields, date_field = ('title', 'text'), 'date'
+    if date_from:
+        queryset = queryset.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{date_field}__lte': date_to})
+    return LikeSearchResults(queryset, fields, q)
@@ -0,0 +1,49 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import HOME_PAGE, bump_news_version, expire_page
+from .models import Comment, News
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Увеличиваем счётчик комментариев новости."""
+    # Неопубликованные учитываются при публикации,
+    # см. news.moderation_queue.
+    if created and instance.status == Comment.Status.PUBLISHED:
+        News.objects.filter(pk=instance.news_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Уменьшаем счётчик комментариев новости."""
+    if instance.status != Comment.Status.PUBLISHED:
+        return
+    News.objects.filter(
+        pk=instance.news_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_thread(sender, instance, **kwargs):
+    """Любое изменение комментария меняет ветку на странице новости."""
+    bump_news_version(instance.news_id)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_body(sender, instance, **kwargs):
+    bump_news_version(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def expire_home_page(sender, **kwargs):
+    """На главной видны новости и число комментариев к ним."""
+    expire_page(HOME_PAGE)
@@ -1,12 +1,25 @@
+from django.conf import settings
 from django.urls import path
 
 from news import views
 
 app_name = 'news'
 
+# Под ASGI (см. yanews.asgi) список и страница новости асинхронные.
+if settings.NEWS_ASYNC_VIEWS:
+    NewsList, NewsDetailView = views.AsyncNewsList, views.AsyncNewsDetailView
+else:
+    NewsList, NewsDetailView = views.NewsList, views.NewsDetailView
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', NewsList.as_view(), name='home'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('news/<int:pk>/', NewsDetailView.as_view(), name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
@@ -1,38 +1,177 @@
+from http import HTTPStatus
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
 from django.urls import reverse
+from django.utils.decorators import classonlymethod
+from django.utils.safestring import mark_safe
 from django.views import generic
 
-from .forms import CommentForm
+from .cache import (
+    BODY, HOME_PAGE, THREAD, get_fragments, get_fresh_page,
+    get_news_version, get_or_render_page, set_fragments
+)
+from .forms import CommentForm, SearchForm
 from .models import Comment, News
+from .moderation_queue import queue_enabled, submit
+from .pagination import get_comments_page
+from .search import search
+from .write_behind import buffer_comment, with_pending, write_behind_enabled
+
+PENDING_MESSAGE = 'Комментарий появится на странице после проверки.'
+
+
+def is_anonymous_get(request):
+    """GET без сессии: такому посетителю отдаются общие страницы."""
+    return (
+        request.method == 'GET'
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+class AnonymousPageCacheMixin:
+    """
+    Кеширует всю страницу для GET-запросов без сессии.
+
+    У таких посетителей страница одинаковая, поэтому её можно
+    отдавать из кеша; сбрасывается кеш сигналами в news.signals.
+    Без page_cache_key страница не кешируется.
+    """
+    page_cache_key = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.page_cache_key is None or not is_anonymous_get(request):
+            return super().dispatch(request, *args, **kwargs)
+        response = None
 
+        def render():
+            nonlocal response
+            response = super(AnonymousPageCacheMixin, self).dispatch(
+                request, *args, **kwargs
+            )
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code == HTTPStatus.OK and not response.cookies:
+                return response.content, response['Content-Type']
+            return None
 
-class NewsList(generic.ListView):
+        page = get_or_render_page(self.page_cache_key, render)
+        if response is not None:
+            return response
+        content, content_type = page
+        return HttpResponse(content, content_type=content_type)
+
+
+class NewsList(AnonymousPageCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    page_cache_key = HOME_PAGE
 
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта. Число
+        комментариев берётся из денормализованного поля comment_count,
+        поэтому сами комментарии не загружаются.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по новостям или комментариям с подсветкой совпадений."""
+    template_name = 'news/search.html'
+    paginate_by = settings.NEWS_COUNT_ON_HOME_PAGE
+
+    def get(self, request, *args, **kwargs):
+        self.form = SearchForm(request.GET or None)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if not self.form.is_valid():
+            return []
+        return search(**self.form.cleaned_data)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['query_string'] = query.urlencode()
+        return context
+
+
+class NewsPageMixin:
+    """
+    Контекст страницы новости: текст и первая страница комментариев.
+
+    Оба фрагмента кешируются. Фрагмент ветки зависит от пользователя
+    (ссылки редактирования), поэтому из кеша он берётся и в кеш
+    кладётся только для анонимов.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        news_pk = self.object.pk
+        anonymous = not self.request.user.is_authenticated
+        version = get_news_version(news_pk)
+        fragments = get_fragments(
+            news_pk, version, (BODY, THREAD) if anonymous else (BODY,)
+        )
+        if fragments is None or not anonymous:
+            context.update(self.get_thread_context(news_pk))
+        if fragments is None:
+            fragments = {
+                BODY: render_to_string(
+                    'news/includes/body.html', {'news': self.object}
+                )
+            }
+            if anonymous:
+                fragments[THREAD] = render_to_string(
+                    'news/includes/thread.html', context, self.request
+                )
+            set_fragments(news_pk, version, fragments)
+        context['body_html'] = mark_safe(fragments[BODY])
+        context['thread_html'] = mark_safe(fragments.get(THREAD, ''))
+        return context
+
+    def get_thread_context(self, news_pk):
+        """Первая страница комментариев, остальные — через news:comments."""
+        comments, next_cursor = get_comments_page(news_pk)
+        return {
+            'comments': with_pending(
+                comments, next_cursor, news_pk, self.request.user
+            ),
+            'next_cursor': next_cursor,
+            'news_pk': news_pk,
+        }
 
-class NewsDetail(generic.DetailView):
+
+class NewsDetail(NewsPageMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
+    def get(self, request, *args, **kwargs):
+        """Анонимам страница собирается из кеша без запросов к БД."""
+        if not request.user.is_authenticated:
+            news_pk = self.kwargs['pk']
+            fragments = get_fragments(news_pk, get_news_version(news_pk))
+            if fragments is not None:
+                return self.render_to_response({
+                    'body_html': mark_safe(fragments[BODY]),
+                    'thread_html': mark_safe(fragments[THREAD]),
+                })
+        return super().get(request, *args, **kwargs)
+
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
+        obj = get_object_or_404(self.model, pk=self.kwargs['pk'])
         return obj
 
     def get_context_data(self, **kwargs):
@@ -42,8 +181,32 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(generic.TemplateView):
+    """Следующая страница комментариев в виде HTML-фрагмента."""
+    template_name = 'news/includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        comments, next_cursor = get_comments_page(
+            self.kwargs['pk'], self.request.GET.get('after')
+        )
+        # Раз комментарии нашлись, новость есть; лишний запрос нужен
+        # только для пустой страницы.
+        if not comments and not News.objects.filter(
+            pk=self.kwargs['pk']
+        ).exists():
+            raise Http404
+        context['comments'] = with_pending(
+            comments, next_cursor, self.kwargs['pk'], self.request.user
+        )
+        context['next_cursor'] = next_cursor
+        context['news_pk'] = self.kwargs['pk']
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
+        NewsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -59,23 +222,93 @@ class NewsComment(
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if queue_enabled():
+            submit(comment)
+            messages.info(self.request, PENDING_MESSAGE)
+        elif not (write_behind_enabled() and buffer_comment(comment)):
+            comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
+    # Представления собираются один раз при импорте, а не на каждый запрос.
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        return self.detail_view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
+
+
+class AsyncViewMixin:
+    """
+    Асинхронная обёртка над синхронным представлением для ASGI.
+
+    Ответ анониму, который целиком есть в кеше, собирается в потоке
+    без привязки к соединению с БД. Всё остальное — запросы к БД
+    и рендер — выполняется одним вызовом sync_to_async, а не переходом
+    в поток на каждый запрос к БД.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):  # noqa: N805
+        # По этой отметке Django вызывает представление как корутину;
+        # начиная с 4.1 так же поступает View.as_view.
+        return markcoroutinefunction(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if is_anonymous_get(request):
+            # Кеш может быть сетевым, а ответ из него ещё рендерится:
+            # не блокируем цикл событий. БД здесь не нужна, поэтому
+            # общий для запросов поток с соединением не занимаем.
+            response = await sync_to_async(
+                self.get_cached_response, thread_sensitive=False
+            )(request, *args, **kwargs)
+            if response is not None:
+                return response
+        return await sync_to_async(self.sync_dispatch)(
+            request, *args, **kwargs
+        )
+
+    def get_cached_response(self, request, *args, **kwargs):
+        """Ответ анониму только из кеша или None; к БД не обращается."""
+        return None
+
+    def sync_dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+
+class AsyncNewsList(AsyncViewMixin, NewsList):
+
+    def get_cached_response(self, request, *args, **kwargs):
+        page = get_fresh_page(self.page_cache_key)
+        if page is None:
+            return None
+        content, content_type = page
+        return HttpResponse(content, content_type=content_type)
+
+
+class AsyncNewsDetailView(AsyncViewMixin, NewsDetailView):
+
+    def get_cached_response(self, request, *args, **kwargs):
+        news_pk = kwargs['pk']
+        fragments = get_fragments(news_pk, get_news_version(news_pk))
+        if fragments is None:
+            return None
+        return TemplateResponse(request, NewsDetail.template_name, {
+            'body_html': mark_safe(fragments[BODY]),
+            'thread_html': mark_safe(fragments[THREAD]),
+        }).render()
 
 
 class CommentBase(LoginRequiredMixin):
@@ -83,14 +316,22 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        # Комментарий уже загружен в self.object, а для адреса
+        # достаточно news_id: новость не запрашиваем.
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Заголовок новости выводится на страницах редактирования
+        и удаления, поэтому новость загружается тем же запросом.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,6 +339,14 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        if not queue_enabled():
+            return super().form_valid(form)
+        # Новый текст проходит модерацию, как и новый комментарий.
+        submit(form.instance)
+        messages.info(self.request, PENDING_MESSAGE)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
@@ -0,0 +1,285 @@
+"""
+Отложенная запись комментариев пачками (write-behind).
+
+При NEWS_COMMENT_WRITE_BEHIND комментарий из формы не пишется в БД
+в самом запросе, а попадает в ограниченный буфер процесса. Фоновый
+поток записывает буфер одним bulk_create каждые
+NEWS_WRITE_BEHIND_INTERVAL секунд или сразу по набору
+NEWS_WRITE_BEHIND_BATCH_SIZE комментариев. Пока комментарий
+не записан, его автор видит его на странице новости, остальные —
+после записи.
+
+С NEWS_WRITE_BEHIND_SPOOL_DIR каждый комментарий сначала дописывается
+в файл процесса <pid>.ndjson в этом каталоге, а после записи пачки
+файл очищается. Пока процесс жив, он держит блокировку <pid>.lock.
+Файлы, чью блокировку удалось взять, остались от упавших процессов:
+первый обратившийся к буферу процесс забирает их комментарии себе.
+Упав между коммитом и очисткой файла, процесс запишет пачку
+повторно: доставка «хотя бы один раз».
+
+Комментарии к новостям и от пользователей, удалённых до записи
+пачки, отбрасываются с записью в лог.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, News
+from .moderation_queue import change_comment_counts
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: файлов буфера нет, только буфер в памяти.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def write_behind_enabled():
+    return settings.NEWS_COMMENT_WRITE_BEHIND
+
+
+class CommentBuffer:
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        # Запись пачек по одной: фоновым потоком или вызовом flush().
+        self.flush_lock = threading.Lock()
+        self.items = []
+        # Пачка, которая записывается прямо сейчас: её ещё нет в БД,
+        # но автору она уже должна быть видна.
+        self.flushing = []
+        self.started = False
+        self.spool = None
+        self.spool_lock = None
+
+    def add(self, comment):
+        """Кладём комментарий в буфер. False, если буфер заполнен."""
+        with self.lock:
+            self._start()
+            if len(self.items) >= settings.NEWS_WRITE_BEHIND_MAX_SIZE:
+                return False
+            comment.created = timezone.now()
+            if self.spool is not None:
+                self.spool.write(_dump(comment))
+                self.spool.flush()
+            self.items.append(comment)
+            if len(self.items) >= settings.NEWS_WRITE_BEHIND_BATCH_SIZE:
+                self.lock.notify()
+        return True
+
+    def pending_for(self, news_id, author_id):
+        """Ещё не записанные комментарии автора к новости."""
+        with self.lock:
+            return [
+                comment for comment in self.flushing + self.items
+                if comment.news_id == news_id
+                and comment.author_id == author_id
+            ]
+
+    def flush(self):
+        """
+        Записываем буфер одной транзакцией. Возвращаем число записанных.
+
+        bulk_create не отправляет сигналы, поэтому comment_count
+        и кеш страниц обновляются здесь же, по пачке сразу.
+        Если запись не удалась, пачка возвращается в начало буфера.
+        """
+        with self.flush_lock:
+            with self.lock:
+                self._start()
+                batch, self.items = self.items, []
+                self.flushing = batch
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    written = _drop_orphans(batch)
+                    Comment.objects.bulk_create(written)
+                    change_comment_counts(
+                        Counter(comment.news_id for comment in written), 1
+                    )
+            except Exception:
+                with self.lock:
+                    self.items[:0] = batch
+                    self.flushing = []
+                raise
+            with self.lock:
+                self.flushing = []
+                if self.spool is not None:
+                    self._rewrite_spool()
+            return len(written)
+
+    def _start(self):
+        """Первое обращение: восстанавливаем файлы и запускаем поток."""
+        if self.started:
+            return
+        self.started = True
+        directory = settings.NEWS_WRITE_BEHIND_SPOOL_DIR
+        if directory:
+            self._open_spool(Path(directory))
+        atexit.register(self.flush)
+        if settings.NEWS_WRITE_BEHIND_INTERVAL is not None:
+            threading.Thread(
+                target=self._run, name='comment-write-behind', daemon=True
+            ).start()
+
+    def _open_spool(self, directory):
+        """Берём свой файл и забираем файлы упавших процессов."""
+        if fcntl is None:
+            raise ImproperlyConfigured(
+                'NEWS_WRITE_BEHIND_SPOOL_DIR требует fcntl (POSIX).'
+            )
+        directory.mkdir(parents=True, exist_ok=True)
+        own = directory / f'{os.getpid()}.lock'
+        # Блокировка держится, пока открыт файл, то есть до конца
+        # процесса. Свой файл мог остаться от упавшего процесса
+        # с тем же pid: его комментарии тоже наши.
+        self.spool_lock = _lock(own, wait=True)
+        orphans = []
+        for lock_path in sorted(directory.glob('*.lock')):
+            if lock_path == own:
+                lock = None
+            else:
+                lock = _lock(lock_path, wait=False)
+                if lock is None:
+                    # Процесс жив и пишет свой файл сам.
+                    continue
+            spool = lock_path.with_suffix('.ndjson')
+            if spool.exists():
+                with open(spool, encoding='utf-8') as lines:
+                    self.items.extend(
+                        _load(line) for line in lines if line.strip()
+                    )
+            if lock is not None:
+                orphans.append((lock, lock_path, spool))
+        self.spool = open(own.with_suffix('.ndjson'), 'a', encoding='utf-8')
+        self._rewrite_spool()
+        # Чужие файлы удаляем, только когда их строки уже в нашем.
+        for lock, lock_path, spool in orphans:
+            spool.unlink(missing_ok=True)
+            lock_path.unlink(missing_ok=True)
+            lock.close()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.lock.wait_for(
+                    lambda: (
+                        len(self.items)
+                        >= settings.NEWS_WRITE_BEHIND_BATCH_SIZE
+                    ),
+                    settings.NEWS_WRITE_BEHIND_INTERVAL,
+                )
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать пачку комментариев')
+
+    def _rewrite_spool(self):
+        """В файле остаются только комментарии, пришедшие во время записи."""
+        path = self.spool.name
+        self.spool.close()
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as spool:
+            spool.writelines(map(_dump, self.items))
+        os.replace(temporary, path)
+        self.spool = open(path, 'a', encoding='utf-8')
+
+
+def _lock(path, wait):
+    """
+    Открытый файл path под исключительной блокировкой.
+
+    None, если файл заблокирован другим процессом, а wait ложно,
+    или если его удалили, пока мы ждали блокировку.
+    """
+    while True:
+        lock = open(path, 'a')
+        try:
+            fcntl.flock(
+                lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            lock.close()
+            return None
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(lock.fileno()).st_ino:
+            return lock
+        lock.close()
+        if not wait:
+            return None
+
+
+def _drop_orphans(batch):
+    """Комментарии пачки, чьи новость и автор ещё существуют."""
+    news_ids = set(News.objects.filter(
+        pk__in={comment.news_id for comment in batch}
+    ).values_list('pk', flat=True))
+    author_ids = set(get_user_model().objects.filter(
+        pk__in={comment.author_id for comment in batch}
+    ).values_list('pk', flat=True))
+    kept = []
+    for comment in batch:
+        if comment.news_id in news_ids and comment.author_id in author_ids:
+            kept.append(comment)
+        else:
+            logger.warning(
+                'Комментарий отброшен: новости %s или автора %s уже нет',
+                comment.news_id, comment.author_id,
+            )
+    return kept
+
+
+def _dump(comment):
+    return json.dumps({
+        'news_id': comment.news_id,
+        'author_id': comment.author_id,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }, ensure_ascii=False) + '\n'
+
+
+def _load(line):
+    data = json.loads(line)
+    created = data.pop('created', None)
+    return Comment(
+        created=parse_datetime(created) if created else timezone.now(),
+        **data
+    )
+
+
+# Один буфер на процесс.
+comment_buffer = CommentBuffer()
+
+
+def buffer_comment(comment):
+    """Откладываем запись комментария. False — буфер заполнен."""
+    return comment_buffer.add(comment)
+
+
+def with_pending(comments, next_cursor, news_id, user):
+    """
+    Добавляем к последней странице ветки незаписанные комментарии user.
+
+    Так автор сразу видит свой комментарий, хотя в БД его ещё нет.
+    """
+    if next_cursor or not user.is_authenticated:
+        return comments
+    return comments + comment_buffer.pending_for(news_id, user.pk)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+# Под ASGI список и страница новости обслуживаются асинхронными
+# представлениями; NEWS_ASYNC_VIEWS=0 возвращает синхронные.
+os.environ.setdefault('NEWS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
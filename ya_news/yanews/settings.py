@@ -1,8 +1,12 @@
+import os
+import sys
 from pathlib import Path
 
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+# Общий для ya_news и ya_note код лежит в корне репозитория (yacommon).
+sys.path.append(str(BASE_DIR.parent))
 
 SECRET_KEY = 'django-insecure-7)dgs++2!#==aye4rd=5)c)bw0eokiyqx0hts6#t80!$c&$s+('
 
@@ -21,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,8 +58,33 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Обычный бэкенд SQLite с PRAGMA на каждом соединении,
+        # см. yacommon.sqlite.base.
+        'ENGINE': 'yacommon.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, PRAGMA не выполняются заново.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Сколько секунд ждать освобождения блокировки записи.
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Читатели не блокируют писателя и наоборот.
+                'journal_mode': 'WAL',
+                # В режиме WAL fsync только на контрольных точках.
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                # Отрицательное значение — размер кеша страниц в КиБ.
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -80,3 +110,103 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+# Сколько секунд хранятся отрендеренные фрагменты страницы новости.
+NEWS_DETAIL_CACHE_TIMEOUT = 60 * 60
+# Кеш страниц для посетителей без сессии: сколько секунд страница
+# свежая, сколько ещё можно отдавать устаревшую копию, пока её
+# пересчитывают, и на сколько берётся блокировка пересчёта.
+PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_STALE_TIMEOUT = 60 * 10
+PAGE_CACHE_LOCK_TIMEOUT = 10
+
+# Класс, проверяющий комментарии на запрещённые слова.
+BAD_WORDS_MATCHER = 'news.moderation.TrieRegexMatcher'
+
+# Асинхронные NewsList и NewsDetailView; включает yanews.asgi.
+NEWS_ASYNC_VIEWS = os.getenv('NEWS_ASYNC_VIEWS') == '1'
+# Модерация комментариев: 'sync' — проверка прямо в запросе,
+# 'queue' — комментарий ждёт фоновых обработчиков
+# (manage.py moderate_comments) и до проверки не виден.
+NEWS_COMMENT_MODERATION = os.getenv('NEWS_COMMENT_MODERATION', 'sync')
+# Сколько комментариев обработчик забирает из очереди за раз.
+NEWS_MODERATION_BATCH_SIZE = 100
+# Через сколько секунд взятая, но не завершённая задача достаётся
+# другому обработчику.
+NEWS_MODERATION_CLAIM_TIMEOUT = 60
+# Сколько секунд хранятся завершённые задачи для метрик.
+NEWS_MODERATION_KEEP_FINISHED = 60 * 60
+# Отложенная запись комментариев пачками (см. news.write_behind);
+# в режиме модерации 'queue' не используется.
+NEWS_COMMENT_WRITE_BEHIND = os.getenv('NEWS_COMMENT_WRITE_BEHIND') == '1'
+# Как часто фоновый поток записывает буфер, в секундах. None — поток
+# не запускается, буфер записывает только flush().
+NEWS_WRITE_BEHIND_INTERVAL = 0.05
+# Сколько комментариев записывается сразу, не дожидаясь интервала.
+NEWS_WRITE_BEHIND_BATCH_SIZE = 200
+# Сколько комментариев может ждать записи; сверх этого они пишутся
+# прямо в запросе.
+NEWS_WRITE_BEHIND_MAX_SIZE = 5000
+# Каталог, где каждый процесс дописывает ещё не записанные комментарии
+# в свой файл <pid>.ndjson; его могут делить все процессы сервера.
+# None — буфер только в памяти.
+NEWS_WRITE_BEHIND_SPOOL_DIR = (
+    os.getenv('NEWS_WRITE_BEHIND_SPOOL_DIR') or None
+)
+
+# Сессии хранятся только в БД. cached_db здесь не годится: кеш
+# LocMemCache у каждого процесса свой, и сессия, закрытая выходом
+# в одном процессе, жила бы в кеше остальных до конца своего срока.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+AUTHENTICATION_BACKENDS = [
+    'yacommon.auth.CachedUserBackend',
+    # Для сессий, открытых до подключения кеша пользователей.
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Сколько секунд процесс помнит пользователя; 0 — не кешировать.
+# Смена пароля, блокировка и выход сбрасывают запись только в том
+# процессе, где они произошли: остальные до конца этого срока пускают
+# пользователя по старым данным, в том числе по сессиям, открытым
+# до смены пароля.
+AUTH_USER_CACHE_TIMEOUT = 5
+
+# Метрики запросов (см. yacommon.metrics): выключены по умолчанию.
+METRICS_ENABLED = False
+# Сколько раз один и тот же SQL может выполниться за запрос,
+# прежде чем он попадёт в лог как возможный N+1.
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+# Дополнительные метрики, которые снимаются при каждом запросе
+# metrics/: функции возвращают тройки (имя, описание, значение).
+METRICS_COLLECTORS = ('news.moderation_queue.collect_metrics',)
+
+# Лог по каждому запросу пишется в файл с ротацией. Фильтр пропускает
+# записи, только пока METRICS_ENABLED включена, и проверяет её при
+# каждой записи, поэтому файл не создаётся, пока метрики выключены.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'metrics_enabled': {
+            '()': 'yacommon.metrics.MetricsEnabledFilter',
+        },
+    },
+    'handlers': {
+        'metrics': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'metrics.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'encoding': 'utf-8',
+            'filters': ['metrics_enabled'],
+        },
+    },
+    'loggers': {
+        'metrics': {
+            'handlers': ['metrics'],
+            'level': 'INFO',
+        },
+    },
+}
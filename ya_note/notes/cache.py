@@ -0,0 +1,31 @@
+"""Кеш отрендеренного списка заметок пользователя."""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(user_id):
+    return f'notes:list:version:{user_id}'
+
+
+def get_list_cache_key(user_id, cursor):
+    """
+    Ключ страницы списка.
+
+    В ключ входит версия, поэтому для сброса всех страниц
+    пользователя достаточно выпустить новую. Версия — время выпуска
+    в наносекундах, а не счётчик: если запись о версии вытеснят
+    из кеша, новая не совпадёт со старой и не оживит старые страницы.
+    """
+    version = cache.get_or_set(_version_key(user_id), time.time_ns, None)
+    return f'notes:list:{user_id}:{version}:{cursor or ""}'
+
+
+def invalidate_notes_list(user_id):
+    """Сбрасываем все закешированные страницы списка пользователя."""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def cache_list_page(key, response):
+    cache.set(key, response.content, settings.NOTES_LIST_CACHE_TIMEOUT)
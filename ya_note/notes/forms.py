@@ -1,11 +1,9 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Note
+from .models import SLUG_WARNING, Note
 
-WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+WARNING = SLUG_WARNING
 
 
 class NoteForm(forms.ModelForm):
@@ -16,12 +14,20 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
+        """
+        Обрабатывает случай, если slug не уникален.
+
+        Пустой slug собирается из заголовка и при совпадении получает
+        числовой суффикс, а повтор заданного вручную slug — ошибка.
+        """
         cleaned_data = super().clean()
         slug = cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
+            note = Note(
+                pk=self.instance.pk, title=cleaned_data.get('title') or ''
+            )
+            Note.objects.allocate_slugs([note])
+            return note.slug
         if Note.objects.filter(
                 slug=slug
         ).exclude(id=self.instance.pk).exists():
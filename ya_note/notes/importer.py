@@ -0,0 +1,115 @@
+"""Массовый импорт заметок из NDJSON."""
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import invalidate_notes_list
+from .forms import WARNING
+from .models import QUOTA_WARNING, Note, NoteStats
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    # Пары (номер строки, словарь ошибок по полям).
+    errors: list = field(default_factory=list)
+
+
+def import_notes(lines, author, batch_size=None):
+    """
+    Импортируем заметки из строк NDJSON от имени author.
+
+    Строки проверяются и записываются пачками: на пачку приходится
+    один запрос за занятыми slug и один bulk_create в отдельной
+    транзакции. Ошибочные строки пропускаются и попадают в отчёт,
+    как и строки, которым не хватило места в квоте автора.
+    """
+    batch_size = batch_size or settings.NOTES_IMPORT_BATCH_SIZE
+    result = ImportResult()
+    numbered = enumerate(lines, start=1)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        notes = []
+        for line_number, line in batch:
+            note = _parse_line(line, line_number, result)
+            if note is not None:
+                note.author = author
+                notes.append((line_number, note))
+        if notes:
+            _save_batch(notes, result)
+    result.errors.sort(key=itemgetter(0))
+    if result.created:
+        invalidate_notes_list(author.pk)
+    return result
+
+
+def _parse_line(line, line_number, result):
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    if not line.strip():
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        _add_error(result, line_number, 'Некорректный JSON.')
+        return None
+    if not isinstance(data, dict):
+        _add_error(result, line_number, 'Ожидался JSON-объект.')
+        return None
+    note = Note(
+        title=data.get('title', ''),
+        text=data.get('text', ''),
+        slug=data.get('slug') or '',
+    )
+    try:
+        # Те же проверки полей, что и в NoteForm, но без построения
+        # формы на каждую строку и без запроса на уникальность slug.
+        note.clean_fields(exclude=('author',))
+    except ValidationError as error:
+        result.errors.append((line_number, {
+            field_name: [
+                {'message': message, 'code': field_error.code or 'invalid'}
+                for field_error in field_errors
+                for message in field_error.messages
+            ]
+            for field_name, field_errors in error.error_dict.items()
+        }))
+        return None
+    return note
+
+
+def _save_batch(notes, result):
+    with transaction.atomic():
+        conflicts = set(map(id, Note.objects.allocate_slugs(
+            [note for _, note in notes]
+        )))
+        valid = []
+        for line_number, note in notes:
+            if id(note) in conflicts:
+                _add_error(
+                    result, line_number, note.slug + WARNING,
+                    field='slug', code='unique'
+                )
+            else:
+                valid.append((line_number, note))
+        granted = NoteStats.objects.reserve(
+            valid[0][1].author_id, len(valid)
+        ) if valid else 0
+        for line_number, _ in valid[granted:]:
+            _add_error(result, line_number, QUOTA_WARNING, code='quota')
+        Note.objects.bulk_create(note for _, note in valid[:granted])
+    result.created += granted
+
+
+def _add_error(result, line_number, message, field='__all__', code='invalid'):
+    """Ошибка в том же виде, что и form.errors.get_json_data()."""
+    result.errors.append(
+        (line_number, {field: [{'message': message, 'code': code}]})
+    )
@@ -0,0 +1,95 @@
+import statistics
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from notes.models import Note
+from notes.tokens import issue_token
+from yacommon.auth import clear_user_cache
+
+User = get_user_model()
+
+CONFIGS = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTH_USER_CACHE_TIMEOUT': 0,
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTH_USER_CACHE_TIMEOUT': 5,
+    },
+    # Сессии и кеш пользователей как в db: токен обходит их целиком.
+    'token': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTH_USER_CACHE_TIMEOUT': 0,
+        'NOTES_READ_TOKENS': True,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Запросы к БД и задержка notes:list для сессий в БД без кеша '
+        'пользователей, для cached_db с кешем пользователей и для входа '
+        'по токену чтения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1_000)
+        parser.add_argument('--notes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"config":>8} {"queries":>8} {"p50, ms":>8} {"p99, ms":>8}'
+        )
+        for name, config in CONFIGS.items():
+            with transaction.atomic(), override_settings(**config):
+                clear_user_cache()
+                queries, latencies = self.measure(
+                    options['requests'], options['notes']
+                )
+                transaction.set_rollback(True)
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            self.stdout.write(
+                f'{name:>8} {queries:>8.1f} {cuts[49] * 1000:>8.3f} '
+                f'{cuts[98] * 1000:>8.3f}'
+            )
+
+    def measure(self, requests, notes):
+        author = User.objects.create(username='bench-auth')
+        Note.objects.bulk_create_with_slugs(
+            Note(title=f'Заметка {index}', text='Текст', author=author)
+            for index in range(notes)
+        )
+        if settings.NOTES_READ_TOKENS:
+            client = Client(
+                HTTP_HOST='localhost',
+                HTTP_AUTHORIZATION=f'Bearer {issue_token(author)}',
+            )
+        else:
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(author)
+        url = reverse('notes:list')
+        # Первый запрос кладёт страницу в кеш, дальше меряется
+        # только дорога до представления.
+        client.get(url)
+        latencies = []
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            for _ in range(requests):
+                start = perf_counter()
+                client.get(url)
+                latencies.append(perf_counter() - start)
+        return queries / requests, latencies
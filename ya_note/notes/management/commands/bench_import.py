@@ -0,0 +1,61 @@
+import json
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from django.test import Client
+from django.urls import reverse
+
+from notes.importer import import_notes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость импорта NDJSON с поочерёдной отправкой '
+        'тех же заметок в notes:add.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=10_000)
+        parser.add_argument(
+            '--titles', type=int, default=100,
+            help='Сколько разных заголовков в наборе.'
+        )
+
+    def handle(self, *args, **options):
+        rows = [
+            {'title': f'Список покупок {index % options["titles"]}',
+             'text': 'Молоко, хлеб, сыр.'}
+            for index in range(options['notes'])
+        ]
+        lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+        form_rate = self.measure(lambda author: self.replay_form(
+            rows, author
+        ), len(rows))
+        import_rate = self.measure(
+            lambda author: import_notes(lines, author), len(rows)
+        )
+        self.stdout.write(f'notes:add: {form_rate:>9.0f} notes/s')
+        self.stdout.write(f'import:    {import_rate:>9.0f} notes/s')
+        self.stdout.write(f'speedup:   {import_rate / form_rate:>9.1f}x')
+
+    def measure(self, load, count):
+        with transaction.atomic():
+            author = User.objects.create(username='bench-import')
+            start = perf_counter()
+            load(author)
+            elapsed = perf_counter() - start
+            transaction.set_rollback(True)
+        return count / elapsed
+
+    def replay_form(self, rows, author):
+        """POST в NoteCreate на каждую заметку, как делают клиенты сейчас."""
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(author)
+        url = reverse('notes:add')
+        for row in rows:
+            client.post(url, data=row)
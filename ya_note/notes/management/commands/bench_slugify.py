@@ -0,0 +1,67 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from notes.translit import cached_slugify, slugify_cache_info
+
+WORDS = (
+    'список', 'покупок', 'дела', 'на', 'неделю', 'идеи', 'для', 'отпуска',
+    'книги', 'фильмы', 'рецепт', 'встреча', 'заметка', 'планы', 'работа',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет корпус заголовков через slugify с кешем и без него '
+        'и выводит пропускную способность.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help='Файл с заголовками, по одному в строке. Без него '
+                 'корпус генерируется.'
+        )
+        parser.add_argument(
+            '--titles', type=int, default=100_000,
+            help='Размер сгенерированного корпуса.'
+        )
+        parser.add_argument(
+            '--distinct', type=int, default=2_000,
+            help='Число разных заголовков в сгенерированном корпусе.'
+        )
+
+    def handle(self, *args, **options):
+        if options['corpus']:
+            with open(options['corpus'], encoding='utf-8') as corpus:
+                titles = [line.strip() for line in corpus if line.strip()]
+        else:
+            titles = self.generate(options['titles'], options['distinct'])
+        cached_slugify.cache_clear()
+        for label, function in (
+            ('off', cached_slugify.__wrapped__), ('on', cached_slugify)
+        ):
+            start = perf_counter()
+            for title in titles:
+                function(title)
+            elapsed = perf_counter() - start
+            self.stdout.write(
+                f'cache {label:>3}: {len(titles) / elapsed:>12.0f} titles/s'
+            )
+        info = slugify_cache_info()
+        self.stdout.write(
+            f'hits {info.hits}, misses {info.misses}, '
+            f'size {info.currsize}/{info.maxsize}'
+        )
+
+    def generate(self, count, distinct):
+        """Корпус с распределением Ципфа: немногие заголовки частые."""
+        generator = random.Random(0)
+        pool = [
+            ' '.join(generator.choices(WORDS, k=generator.randint(1, 4)))
+            + f' {index}'
+            for index in range(distinct)
+        ]
+        weights = [1 / rank for rank in range(1, distinct + 1)]
+        return generator.choices(pool, weights=weights, k=count)
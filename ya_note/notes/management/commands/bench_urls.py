@@ -0,0 +1,107 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from notes.models import Note
+from notes.urls import app_name, urlpatterns
+from yacommon.bench import measure
+
+User = get_user_model()
+
+IMPORT_BODY = json.dumps(
+    {'title': 'Заметка из замера', 'text': 'Текст'}, ensure_ascii=False
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет тестовый клиент по всем маршрутам notes.urls и выводит '
+        'JSON с перцентилями задержки, RPS и числом запросов к БД. '
+        'Данные готовит generate_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Запросы перед замером: прогрев кешей и шаблонов.'
+        )
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Нужно хотя бы два запроса на адрес.')
+        targets = self.targets()
+        results = {}
+        # Импорт создаёт заметки: откатываем всё после замера.
+        with transaction.atomic():
+            for pattern in urlpatterns:
+                name = f'{app_name}:{pattern.name}'
+                if name not in targets:
+                    self.stderr.write(f'{name}: нет сценария, пропущен.')
+                    continue
+                client, method, url, data = targets[name]
+                extra = {'content_type': 'application/x-ndjson'} if (
+                    isinstance(data, str)
+                ) else {}
+                results[name] = measure(
+                    client, method, url, data,
+                    options['requests'], options['warmup'], **extra
+                )
+            transaction.set_rollback(True)
+        report = json.dumps({
+            'database': connection.vendor,
+            'rows': {
+                'users': User.objects.count(),
+                'notes': Note.objects.count(),
+            },
+            'requests': options['requests'],
+            'urls': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def targets(self):
+        """Клиент, метод, адрес и данные запроса для каждого маршрута."""
+        author = User.objects.annotate(
+            notes=Count('note')
+        ).filter(notes__gt=0).order_by('-notes').first()
+        if author is None:
+            raise CommandError(
+                'Нет пользователей с заметками, сначала выполните '
+                'generate_data.'
+            )
+        slug = Note.objects.filter(author=author).values_list(
+            'slug', flat=True
+        ).first()
+        anonymous = Client(HTTP_HOST='localhost')
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(author)
+        targets = {
+            name: (client, 'get', reverse(name), {})
+            for name in (
+                'notes:add', 'notes:list', 'notes:success', 'notes:export'
+            )
+        }
+        targets.update({
+            name: (client, 'get', reverse(name, args=(slug,)), {})
+            for name in ('notes:edit', 'notes:detail', 'notes:delete')
+        })
+        targets.update({
+            'notes:home': (anonymous, 'get', reverse('notes:home'), {}),
+            'notes:search': (
+                client, 'get', reverse('notes:search'), {'q': 'список'}
+            ),
+            'notes:import': (
+                client, 'post', reverse('notes:import'), IMPORT_BODY
+            ),
+        })
+        return targets
@@ -0,0 +1,86 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.cache import invalidate_notes_list
+from notes.models import Note
+
+User = get_user_model()
+
+WORDS = (
+    'список', 'покупок', 'молоко', 'хлеб', 'встреча', 'звонок', 'отчёт',
+    'проект', 'идея', 'книга', 'фильм', 'рецепт', 'поездка', 'билеты',
+    'врач', 'спорт', 'зарядка', 'план', 'неделя', 'задачи', 'подарок',
+    'день', 'рождения', 'ремонт', 'квартира', 'машина', 'сервис', 'учёба',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями и заметками '
+        'для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--notes', type=int, default=100,
+            help='Среднее число заметок на пользователя.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1_000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Общий пароль созданных пользователей.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self.create_users(
+                options['users'], options['password'], options['batch_size']
+            )
+            notes = [
+                Note(
+                    title=self.sentence(rng, 2, 5)[:100],
+                    text=self.sentence(rng, 10, 200),
+                    author_id=user,
+                )
+                for user in users
+                for _ in range(int(rng.expovariate(1 / options['notes'])))
+            ] if options['notes'] else []
+            # Пустые slug заполняются пачками, как при импорте.
+            Note.objects.bulk_create_with_slugs(
+                notes, batch_size=options['batch_size']
+            )
+        for user in users:
+            invalidate_notes_list(user)
+        self.stdout.write(
+            f'Создано: пользователей {len(users)}, заметок {len(notes)}.'
+        )
+
+    def create_users(self, count, password, batch_size):
+        # Хешируем пароль один раз: это самая медленная часть.
+        password = make_password(password)
+        last_pk = User.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        User.objects.bulk_create(
+            (
+                User(username=f'load-{last_pk + index}', password=password)
+                for index in range(1, count + 1)
+            ),
+            batch_size=batch_size,
+        )
+        # SQLite не возвращает первичные ключи из bulk_create.
+        return list(User.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True
+        ))
+
+    @staticmethod
+    def sentence(rng, shortest, longest):
+        words = rng.choices(WORDS, k=rng.randint(shortest, longest))
+        return ' '.join(words).capitalize() + '.'
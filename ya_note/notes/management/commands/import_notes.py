@@ -0,0 +1,45 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.importer import import_notes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл NDJSON, «-» — стандартный ввод.'
+        )
+        parser.add_argument(
+            '--author', required=True, help='Имя пользователя-автора.'
+        )
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            )
+        if options['path'] == '-':
+            result = import_notes(sys.stdin, author, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                result = import_notes(lines, author, options['batch_size'])
+        for line_number, errors in result.errors:
+            messages = '; '.join(
+                f'{field}: {error["message"]}'
+                for field, field_errors in errors.items()
+                for error in field_errors
+            )
+            self.stderr.write(f'строка {line_number}: {messages}')
+        self.stdout.write(
+            f'Создано заметок: {result.created}, '
+            f'ошибок: {len(result.errors)}.'
+        )
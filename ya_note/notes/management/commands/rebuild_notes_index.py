@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс заметок и триггеры, '
+        'которые поддерживают его в актуальном состоянии.'
+    )
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Индекс FTS5 доступен только для SQLite.')
+        rebuild_index()
+        self.stdout.write('Индекс заметок пересобран.')
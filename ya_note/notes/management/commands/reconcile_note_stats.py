@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from notes.cache import invalidate_notes_list
+from notes.models import Note, NoteStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики заметок пользователей по самим заметкам '
+        'и исправляет разошедшиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            actual = dict(Note.objects.order_by().values_list(
+                'author_id'
+            ).annotate(count=models.Count('pk')))
+            stats = NoteStats.objects.in_bulk()
+            changed, missing = [], []
+            for user_id in User.objects.values_list('pk', flat=True):
+                count = actual.get(user_id, 0)
+                if user_id not in stats:
+                    if count:
+                        missing.append(
+                            NoteStats(user_id=user_id, note_count=count)
+                        )
+                elif stats[user_id].note_count != count:
+                    self.stdout.write(
+                        f'{user_id}: {stats[user_id].note_count} → {count}'
+                    )
+                    stats[user_id].note_count = count
+                    changed.append(stats[user_id])
+            if not options['dry_run']:
+                NoteStats.objects.bulk_update(changed, ('note_count',))
+                NoteStats.objects.bulk_create(missing)
+        if not options['dry_run']:
+            for item in changed + missing:
+                invalidate_notes_list(item.user_id)
+        self.stdout.write(
+            f'Исправлено счётчиков: {len(changed)}, '
+            f'создано: {len(missing)}.'
+        )
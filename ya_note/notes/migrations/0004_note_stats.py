@@ -0,0 +1,40 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    NoteStats = apps.get_model('notes', 'NoteStats')
+    NoteStats.objects.bulk_create(
+        NoteStats(user_id=author_id, note_count=count)
+        for author_id, count in Note.objects.order_by().values_list(
+            'author_id'
+        ).annotate(count=models.Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0003_note_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('note_count', models.PositiveIntegerField(default=0, verbose_name='Заметок')),
+                ('quota', models.PositiveIntegerField(blank=True, help_text='Пусто — общая квота из настройки NOTES_QUOTA.', null=True, verbose_name='Квота')),
+            ],
+            options={
+                'verbose_name': 'статистика заметок',
+                'verbose_name_plural': 'статистика заметок',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
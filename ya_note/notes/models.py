@@ -1,7 +1,157 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest
+
+from .translit import cached_slugify
+
+# Сколько символов slug оставляем под числовой суффикс вида «-123».
+SLUG_SUFFIX_RESERVE = 8
+# Ограничиваем число условий LIKE в одном запросе: SQLite не принимает
+# слишком глубокие деревья выражений.
+SLUG_PREFIXES_PER_QUERY = 200
+# Основа slug для заголовков, в которых нечего транслитерировать.
+DEFAULT_SLUG = 'note'
+QUOTA_WARNING = 'Достигнут лимит заметок, удалите ненужные.'
+SLUG_WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+
+
+class NoteQuotaExceeded(ValidationError):
+    """Новая заметка не помещается в квоту автора."""
+
+    def __init__(self):
+        super().__init__(QUOTA_WARNING, code='quota')
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def allocate_slugs(self, notes):
+        """
+        Заполняем пустые slug уникальными значениями.
+
+        Для повторяющихся заголовков добавляется суффикс: «spisok»,
+        «spisok-2», «spisok-3». Занятые slug выбираются одним запросом
+        на всю пачку, а не запросом на каждую попытку. Возвращаем
+        заметки, чей заданный вручную slug уже занят в БД или
+        повторяется в самой пачке.
+        """
+        max_length = self.model._meta.get_field('slug').max_length
+        pending = [
+            (
+                note,
+                (cached_slugify(note.title) or DEFAULT_SLUG)[:max_length]
+            )
+            for note in notes if not note.slug
+        ]
+        explicit = [note for note in notes if note.slug]
+        taken = self._taken_slugs(
+            {base for _, base in pending}, {note.slug for note in explicit},
+            exclude=[note.pk for note in notes]
+        )
+        conflicts = []
+        for note in explicit:
+            if note.slug in taken:
+                conflicts.append(note)
+            taken.add(note.slug)
+        # Берём наименьший свободный номер начиная с 2: число в конце
+        # чужого заголовка («Список покупок 2024») не сдвигает счётчик.
+        # Счётчик основы запоминаем, чтобы пачка не перебирала номера
+        # заново для каждой заметки.
+        counters = {}
+        for note, base in pending:
+            slug = base
+            if slug in taken:
+                counter = counters.get(base, 2)
+                while slug in taken:
+                    suffix = f'-{counter}'
+                    slug = base[:max_length - len(suffix)] + suffix
+                    counter += 1
+                counters[base] = counter
+            note.slug = slug
+            taken.add(slug)
+        return conflicts
 
-from pytils.translit import slugify
+    def bulk_create_with_slugs(self, notes, batch_size=1000):
+        """
+        bulk_create с заполнением пустых slug.
+
+        На каждую пачку приходится один запрос за занятыми slug
+        и один INSERT, без проверки каждой строки отдельно. Счётчики
+        авторов увеличиваются в той же транзакции, квота не проверяется.
+        Если заданный вручную slug занят, пачка не записывается
+        и поднимается ValidationError. Внутри чужой транзакции точка
+        сохранения не создаётся: при ошибке откатывается вся транзакция.
+        """
+        notes = list(notes)
+        for start in range(0, len(notes), batch_size):
+            batch = notes[start:start + batch_size]
+            with transaction.atomic(savepoint=False):
+                conflicts = self.allocate_slugs(batch)
+                if not conflicts:
+                    for author_id, count in Counter(
+                        note.author_id for note in batch
+                    ).items():
+                        NoteStats.objects.change(author_id, count)
+                    self.bulk_create(batch)
+            # Ошибка поднимается вне блока: ничего не записано, и чужая
+            # транзакция не должна откатываться из-за неё.
+            if conflicts:
+                raise ValidationError({'slug': [
+                    note.slug + SLUG_WARNING for note in conflicts
+                ]})
+        return notes
+
+    def delete(self):
+        """Удаление с уменьшением счётчиков авторов."""
+        with transaction.atomic():
+            for author_id, count in self.order_by().values_list(
+                'author_id'
+            ).annotate(count=models.Count('pk')):
+                NoteStats.objects.change(author_id, -count)
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def _taken_slugs(self, bases, slugs=(), exclude=()):
+        """
+        Занятые slug из данного набора и варианты данных основ.
+
+        Для основы ищем её саму и slug вида «основа-…». Только длинную
+        основу суффикс укорачивает, и для неё берём все slug с тем же
+        началом: так короткий заголовок не тянет пол-таблицы.
+        """
+        exclude = [pk for pk in exclude if pk is not None]
+        root_length = (
+            self.model._meta.get_field('slug').max_length
+            - SLUG_SUFFIX_RESERVE
+        )
+        exact, prefixes = set(slugs), set()
+        for base in bases:
+            if len(base) > root_length:
+                prefixes.add(base[:root_length])
+            else:
+                exact.add(base)
+                prefixes.add(f'{base}-')
+        conditions = [models.Q(slug__in=exact)] if exact else []
+        conditions.extend(
+            models.Q(slug__startswith=prefix) for prefix in prefixes
+        )
+        taken = set()
+        for start in range(0, len(conditions), SLUG_PREFIXES_PER_QUERY):
+            condition = reduce(
+                or_, conditions[start:start + SLUG_PREFIXES_PER_QUERY]
+            )
+            taken.update(
+                self.filter(condition).exclude(pk__in=exclude).values_list(
+                    'slug', flat=True
+                )
+            )
+        return taken
 
 
 class Note(models.Model):
@@ -28,11 +178,137 @@ class Note(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            # Покрывает keyset-пагинацию списка заметок автора.
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+            Note.objects.allocate_slugs([self])
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Место в квоте занимается до INSERT и в той же транзакции:
+        # если запись не удалась, счётчик откатится вместе с ней.
+        with transaction.atomic():
+            if not NoteStats.objects.change(
+                self.author_id, 1, quota=True
+            ):
+                raise NoteQuotaExceeded
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            NoteStats.objects.change(self.author_id, -1)
+            return super().delete(*args, **kwargs)
+
+
+class NoteStatsQuerySet(models.QuerySet):
+
+    def change(self, user_id, delta, quota=False):
+        """
+        Меняем счётчик заметок пользователя на delta одним UPDATE.
+
+        С quota=True счётчик увеличивается, только если после этого
+        он не превысит квоту: условие проверяется в том же UPDATE,
+        поэтому параллельные запросы не проскочат её вдвоём.
+        Возвращаем False, если место в квоте закончилось.
+        Строка создаётся при первом обращении: заметки, записанные
+        до её появления, считаются один раз.
+        """
+        rows = self.filter(pk=user_id)
+        if quota:
+            rows = rows.filter(self._fits_quota(delta))
+        note_count = models.F('note_count') + delta
+        if delta < 0:
+            # Разошедшийся счётчик не должен ломать удаление.
+            note_count = Greatest(note_count, 0)
+        if rows.update(note_count=note_count):
+            return True
+        if self.filter(pk=user_id).exists():
+            return False
+        note_count = Note.objects.filter(author_id=user_id).count()
+        try:
+            with transaction.atomic():
+                self.create(pk=user_id, note_count=note_count)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос.
+            pass
+        return self.change(user_id, delta, quota)
+
+    def reserve(self, user_id, count):
+        """
+        Занимаем в квоте до count мест и возвращаем, сколько вышло.
+
+        Для пачек при импорте: в квоту проходит начало пачки.
+        """
+        while count > 0 and not self.change(user_id, count, quota=True):
+            stats = self.get(pk=user_id)
+            quota = stats.effective_quota
+            count = min(count, quota - stats.note_count)
+        return max(count, 0)
+
+    @staticmethod
+    def _fits_quota(delta):
+        personal = models.Q(
+            quota__isnull=False,
+            note_count__lte=models.F('quota') - delta,
+        )
+        if settings.NOTES_QUOTA is None:
+            return personal | models.Q(quota__isnull=True)
+        return personal | models.Q(
+            quota__isnull=True,
+            note_count__lte=settings.NOTES_QUOTA - delta,
+        )
+
+
+class NoteStats(models.Model):
+    """
+    Число заметок пользователя.
+
+    Обновляется вместе с каждой записью заметок, поэтому число
+    и проверка квоты не требуют COUNT(*) по заметкам. Если счётчики
+    разошлись с данными (правка заметок в обход ORM), их пересчитывает
+    команда reconcile_note_stats.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='note_stats',
+    )
+    note_count = models.PositiveIntegerField('Заметок', default=0)
+    quota = models.PositiveIntegerField(
+        'Квота',
+        null=True,
+        blank=True,
+        help_text='Пусто — общая квота из настройки NOTES_QUOTA.'
+    )
+
+    objects = NoteStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'статистика заметок'
+        verbose_name_plural = 'статистика заметок'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.note_count}'
+
+    @property
+    def effective_quota(self):
+        """Действующая квота или None, если заметки не ограничены."""
+        return self.quota if self.quota is not None else settings.NOTES_QUOTA
+
+    @classmethod
+    def count_for(cls, user_id):
+        """Число заметок пользователя, без создания строки."""
+        return cls.objects.filter(pk=user_id).values_list(
+            'note_count', flat=True
+        ).first() or 0
@@ -0,0 +1,143 @@
+"""Полнотекстовый поиск по заметкам на SQLite FTS5."""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Note
+
+FTS_TABLE = 'notes_note_fts'
+
+# Индекс хранит только токены, сами тексты читаются из notes_note.
+# author_id индексируется как токен, чтобы ограничивать поиск автором
+# прямо внутри FTS, а не фильтром по всем совпадениям.
+CREATE_INDEX_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, text, author_id,
+        content='notes_note', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_note_fts_insert
+    AFTER INSERT ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_note_fts_delete
+    AFTER DELETE ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_note_fts_update
+    AFTER UPDATE ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+)
+DROP_INDEX_SQL = (
+    'DROP TRIGGER IF EXISTS notes_note_fts_insert',
+    'DROP TRIGGER IF EXISTS notes_note_fts_delete',
+    'DROP TRIGGER IF EXISTS notes_note_fts_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+WORD = re.compile(r'\w+')
+
+
+def fts_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def create_index(cursor):
+    """
+    Создаём таблицу индекса и триггеры синхронизации.
+
+    Миграции, пересоздающие notes_note на SQLite, удаляют и триггеры,
+    поэтому после них нужно выполнить rebuild_notes_index.
+    """
+    for statement in CREATE_INDEX_SQL:
+        cursor.execute(statement)
+
+
+def drop_index(cursor):
+    for statement in DROP_INDEX_SQL:
+        cursor.execute(statement)
+
+
+def rebuild_index():
+    """Пересобираем индекс по текущему содержимому notes_note."""
+    with connection.cursor() as cursor:
+        create_index(cursor)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def build_match(query, author_id):
+    """
+    Переводим пользовательский запрос в выражение FTS5.
+
+    Служебный синтаксис FTS5 пользователю недоступен: каждое слово
+    ищется как префикс, все слова должны встретиться в заметке.
+    """
+    words = WORD.findall(query)
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"*' for word in words)
+    return f'author_id:"{author_id}" AND {{title text}}: ({terms})'
+
+
+class SearchResults:
+    """
+    Найденные заметки автора в порядке релевантности (bm25).
+
+    Ведёт себя как последовательность, поэтому подходит Paginator:
+    len() выполняет COUNT по индексу, срез — выборку одной страницы.
+    """
+
+    def __init__(self, query, author_id):
+        self.match = build_match(query, author_id)
+
+    def __len__(self):
+        if self.match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                (self.match,)
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, page):
+        if self.match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 0.0) '
+                f'LIMIT %s OFFSET %s',
+                (self.match, page.stop - page.start, page.start)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        notes = Note.objects.in_bulk(ids)
+        return [notes[pk] for pk in ids if pk in notes]
+
+
+def search_notes(query, author):
+    """Поиск по заметкам автора, без FTS5 — через icontains."""
+    if fts_available():
+        return SearchResults(query, author.pk)
+    condition = Q()
+    for word in WORD.findall(query):
+        condition &= Q(title__icontains=word) | Q(text__icontains=word)
+    return Note.objects.filter(condition, author=author).order_by('pk')
@@ -0,0 +1,13 @@
+import pytest
+
+from django.core.cache import cache
+
+from yacommon.auth import clear_user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кеши живут в памяти процесса и не откатываются вместе с БД.
+    yield
+    cache.clear()
+    clear_user_cache()
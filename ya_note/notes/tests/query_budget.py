@@ -0,0 +1,69 @@
+"""
+Бюджет запросов для тестов на TestCase.
+
+Базовые числа запросов по страницам и объёмам данных лежат
+в query_budget.json рядом с тестами. Перегенерировать их:
+UPDATE_QUERY_BUDGET=1 pytest.
+"""
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+QUERY_BUDGET_FILE = Path(__file__).with_name('query_budget.json')
+UPDATE_QUERY_BUDGET = bool(os.getenv('UPDATE_QUERY_BUDGET'))
+
+
+def load_baseline():
+    if not QUERY_BUDGET_FILE.exists():
+        return {}
+    return json.loads(QUERY_BUDGET_FILE.read_text(encoding='utf-8'))
+
+
+class QueryBudgetMixin:
+    """Добавляет assertQueryBudget(view, size) к TestCase."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.query_budget_baseline = load_baseline()
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_QUERY_BUDGET:
+            # Перечитываем файл: его могли дополнить другие классы.
+            baseline = load_baseline()
+            for view, budgets in cls.query_budget_baseline.items():
+                baseline.setdefault(view, {}).update(budgets)
+            QUERY_BUDGET_FILE.write_text(
+                json.dumps(
+                    baseline, ensure_ascii=False, indent=2, sort_keys=True
+                ) + '\n',
+                encoding='utf-8'
+            )
+        super().tearDownClass()
+
+    @contextmanager
+    def assertQueryBudget(self, view, size):  # noqa: N802
+        with CaptureQueriesContext(connection) as context:
+            yield
+        executed = len(context)
+        budgets = self.query_budget_baseline.setdefault(view, {})
+        if UPDATE_QUERY_BUDGET:
+            budgets[str(size)] = executed
+            return
+        budget = budgets.get(str(size))
+        self.assertIsNotNone(
+            budget,
+            f'Нет бюджета для {view} на {size} записях, '
+            'перегенерируйте базу с UPDATE_QUERY_BUDGET=1'
+        )
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            executed, budget,
+            f'{view} на {size} записях: {executed} запросов '
+            f'при бюджете {budget}:\n{queries}'
+        )
@@ -1,9 +1,12 @@
+import json
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from notes.cache import invalidate_notes_list
 from notes.models import Note
 from yanote.settings import NOTES_COUNT_ON_NOTES_LIST_PAGE
 
@@ -59,3 +62,170 @@ class TestDetailPage(TestCase):
     def test_anonymous_client_has_no_form(self):
         response = self.client.get(self.detail_url)
         self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class TestNotesListPagination(TestCase):
+    NOTES_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заголовок-{index}',
+                text='Просто текст.',
+                slug=f'slug-{index}',
+                author=cls.author,
+            )
+            for index in range(NOTES_COUNT_ON_NOTES_LIST_PAGE + 1)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_next_page_starts_after_cursor(self):
+        response = self.client.get(self.NOTES_URL)
+        first_page = list(response.context['object_list'])
+        self.assertEqual(len(first_page), NOTES_COUNT_ON_NOTES_LIST_PAGE)
+        next_cursor = response.context['next_cursor']
+        self.assertEqual(next_cursor, first_page[-1].pk)
+        # На второй странице осталась одна заметка и ссылки дальше нет.
+        response = self.client.get(self.NOTES_URL, {'after': next_cursor})
+        self.assertEqual(len(response.context['object_list']), 1)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_broken_cursor(self):
+        response = self.client.get(self.NOTES_URL, {'after': 'abc'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.client.get(self.NOTES_URL)
+        # Пользователь уже в кеше процесса, остаётся запрос сессии.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.NOTES_URL)
+        self.assertEqual(first.content, second.content)
+
+    def test_new_note_invalidates_cache(self):
+        last_page = {'after': Note.objects.order_by('pk')[
+            NOTES_COUNT_ON_NOTES_LIST_PAGE - 1
+        ].pk}
+        self.client.get(self.NOTES_URL, last_page)
+        self.client.post(reverse('notes:add'), data={
+            'title': 'Свежая заметка', 'text': 'Текст', 'slug': 'fresh'
+        })
+        # Страница отрендерена заново и уже содержит новую заметку.
+        response = self.client.get(self.NOTES_URL, last_page)
+        self.assertEqual(len(response.context['object_list']), 2)
+
+    def test_evicted_version_does_not_revive_old_pages(self):
+        last_page = {'after': Note.objects.order_by('pk')[
+            NOTES_COUNT_ON_NOTES_LIST_PAGE - 1
+        ].pk}
+        self.client.get(self.NOTES_URL, last_page)
+        Note.objects.create(
+            title='Свежая заметка', text='Текст', author=self.author
+        )
+        invalidate_notes_list(self.author.pk)
+        # Запись о версии вытеснена из кеша, а старые страницы остались.
+        cache.delete(f'notes:list:version:{self.author.pk}')
+        response = self.client.get(self.NOTES_URL, last_page)
+        self.assertContains(response, 'Свежая заметка')
+
+
+class TestNotesExport(TestCase):
+    EXPORT_URL = reverse('notes:export')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст', slug='note', author=cls.author
+        )
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='other', author=cls.reader
+        )
+
+    def test_export_streams_only_own_notes(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.EXPORT_URL)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'id': self.note.pk, 'title': 'Заметка',
+              'text': 'Текст', 'slug': 'note'}]
+        )
+
+
+class TestNotesSearch(TestCase):
+    SEARCH_URL = reverse('notes:search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        reader = User.objects.create(username='Читатель')
+        cls.soup = Note.objects.create(
+            title='Рецепт борща', text='Свёкла, капуста.', author=cls.author
+        )
+        Note.objects.create(
+            title='Покупки', text='Капуста и рецепт не нужен.',
+            author=cls.author
+        )
+        Note.objects.create(
+            title='Рецепт пирога', text='Мука.', author=reader
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def search(self, query):
+        response = self.client.get(self.SEARCH_URL, {'q': query})
+        return list(response.context['object_list'])
+
+    def test_search_is_ranked_and_scoped_to_author(self):
+        found = self.search('рецеп')
+        # Совпадение в заголовке важнее совпадения в тексте,
+        # а заметки другого пользователя не попадают в выдачу.
+        self.assertEqual(len(found), 2)
+        self.assertEqual(found[0], self.soup)
+
+    def test_index_follows_note_changes(self):
+        self.soup.text = 'Теперь со сметаной.'
+        self.soup.save()
+        self.assertEqual(self.search('сметана'), [])
+        self.assertEqual(self.search('сметаной'), [self.soup])
+        self.soup.delete()
+        self.assertEqual(self.search('сметаной'), [])
+
+    def test_fts_syntax_is_not_interpreted(self):
+        # Кавычки и операторы FTS5 ищутся как обычные слова.
+        self.assertEqual(self.search('"капуста OR NEAR('), [])
+
+
+class TestCachedAuth(TestCase):
+    NOTES_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db'
+    )
+    def test_repeated_list_needs_no_queries(self):
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.NOTES_URL)
+        with self.assertNumQueries(0):
+            response = client.get(self.NOTES_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_password_change_evicts_cached_user(self):
+        self.client.force_login(self.author)
+        self.client.get(self.NOTES_URL)
+        self.author.set_password('новый пароль')
+        self.author.save()
+        # Хеш пароля в сессии больше не совпадает: сессия сброшена.
+        response = self.client.get(self.NOTES_URL)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
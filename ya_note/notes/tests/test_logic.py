@@ -1,13 +1,21 @@
+import json
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.auth import authenticate, get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 # Импортируем из файла с формами список стоп-слов и предупреждение формы.
 # Загляните в news/forms.py, разберитесь с их назначением.
 from notes.forms import WARNING
-from notes.models import Note
+from notes.models import QUOTA_WARNING, Note, NoteStats
+from notes.translit import cached_slugify, slugify_cache_info
 
 User = get_user_model()
 
@@ -165,3 +173,293 @@ class TestNoteEditDelete(TestCase):
         self.note.refresh_from_db()
         # Проверяем, что текст остался тем же, что и был.
         self.assertEqual(self.note.text, self.NOTE_TEXT)
+
+
+class TestSlugAllocation(TestCase):
+    TITLE = 'Список покупок'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.author)
+
+    def test_empty_slug_gets_numeric_suffix(self):
+        form_data = {'title': self.TITLE, 'text': 'Текст', 'slug': ''}
+        for _ in range(3):
+            response = self.auth_client.post(
+                reverse('notes:add'), data=form_data
+            )
+            self.assertRedirects(response, reverse('notes:success'))
+        self.assertQuerysetEqual(
+            Note.objects.order_by('pk').values_list('slug', flat=True),
+            ('spisok-pokupok', 'spisok-pokupok-2', 'spisok-pokupok-3'),
+            transform=None
+        )
+
+    def test_bulk_create_with_slugs(self):
+        Note.objects.create(title=self.TITLE, text='', author=self.author)
+        notes = [
+            Note(title=self.TITLE, text='Текст', author=self.author)
+            for _ in range(5)
+        ]
+        # На всю пачку: запрос за занятыми slug, UPDATE счётчика автора
+        # и INSERT. Тест уже в транзакции, точка сохранения не нужна.
+        with self.assertNumQueries(3):
+            Note.objects.bulk_create_with_slugs(notes)
+        slugs = set(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), 6)
+        self.assertIn('spisok-pokupok-6', slugs)
+
+    def test_number_in_title_does_not_shift_suffix(self):
+        Note.objects.create(
+            title=f'{self.TITLE} 2024', text='', author=self.author
+        )
+        notes = Note.objects.bulk_create_with_slugs(
+            Note(title=self.TITLE, text='Текст', author=self.author)
+            for _ in range(2)
+        )
+        self.assertEqual(
+            [note.slug for note in notes],
+            ['spisok-pokupok', 'spisok-pokupok-2']
+        )
+
+    def test_short_title_looks_up_only_its_own_slugs(self):
+        with CaptureQueriesContext(connection) as context:
+            Note.objects.allocate_slugs([Note(title='A', text='')])
+        # Не «a%», иначе загрузятся все slug на эту букву.
+        self.assertIn("LIKE 'a-%'", context.captured_queries[0]['sql'])
+
+    def test_bulk_create_rejects_taken_slugs(self):
+        notes = [
+            Note(title=self.TITLE, text='Текст', slug='same',
+                 author=self.author)
+            for _ in range(2)
+        ]
+        with self.assertRaisesMessage(ValidationError, 'same' + WARNING):
+            Note.objects.bulk_create_with_slugs(notes)
+        self.assertFalse(Note.objects.filter(slug='same').exists())
+
+    def test_repeated_title_is_transliterated_once(self):
+        cached_slugify.cache_clear()
+        Note.objects.bulk_create_with_slugs(
+            Note(title=self.TITLE, text='Текст', author=self.author)
+            for _ in range(3)
+        )
+        info = slugify_cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+
+class TestNotesImport(TestCase):
+    IMPORT_URL = reverse('notes:import')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.author)
+        Note.objects.create(
+            title='Старая', text='Текст', slug='taken', author=cls.author
+        )
+
+    def post_lines(self, *rows):
+        body = '\n'.join(
+            row if isinstance(row, str) else json.dumps(row)
+            for row in rows
+        )
+        return self.auth_client.post(
+            self.IMPORT_URL, data=body, content_type='application/x-ndjson'
+        )
+
+    def test_import_reports_errors_per_row(self):
+        response = self.post_lines(
+            {'title': 'Список покупок', 'text': 'Хлеб'},
+            {'title': 'Список покупок', 'text': 'Молоко'},
+            {'title': 'Занятый', 'text': 'Текст', 'slug': 'taken'},
+            'не json',
+            {'title': 'Без текста'},
+        )
+        result = response.json()
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(
+            [error['line'] for error in result['errors']], [3, 4, 5]
+        )
+        self.assertIn('slug', result['errors'][0]['errors'])
+        self.assertIn('text', result['errors'][2]['errors'])
+        self.assertTrue(
+            Note.objects.filter(slug='spisok-pokupok-2').exists()
+        )
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        rows = [{'title': 'Заметка', 'text': 'Текст'}] * 50
+        # Сессия, пользователь, slug пачки, SAVEPOINT, счётчик, INSERT,
+        # RELEASE и число заметок для ответа.
+        with self.assertNumQueries(8):
+            response = self.post_lines(*rows)
+        self.assertEqual(response.json()['created'], 50)
+
+
+class TestNoteStats(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.author)
+        cls.form_data = {'title': 'Заметка', 'text': 'Текст'}
+
+    def note_count(self):
+        return NoteStats.count_for(self.author.pk)
+
+    def test_counter_follows_writes(self):
+        self.auth_client.post(reverse('notes:add'), data=self.form_data)
+        self.assertEqual(self.note_count(), 1)
+        Note.objects.bulk_create_with_slugs(
+            Note(title='Пачка', text='Текст', author=self.author)
+            for _ in range(3)
+        )
+        self.assertEqual(self.note_count(), 4)
+        slug = Note.objects.values_list('slug', flat=True).first()
+        self.auth_client.post(reverse('notes:delete', args=(slug,)))
+        self.assertEqual(self.note_count(), 3)
+        Note.objects.filter(title='Пачка').delete()
+        self.assertEqual(self.note_count(), 0)
+
+    def test_list_header_and_stats_show_count(self):
+        self.auth_client.post(reverse('notes:add'), data=self.form_data)
+        response = self.auth_client.get(reverse('notes:list'))
+        self.assertContains(response, 'Список заметок (1)')
+        response = self.auth_client.get(reverse('notes:stats'))
+        self.assertEqual(response.json(), {'note_count': 1, 'quota': None})
+
+    @override_settings(NOTES_QUOTA=1)
+    def test_quota_blocks_create(self):
+        self.auth_client.post(reverse('notes:add'), data=self.form_data)
+        # Квота проверяется по счётчику, без COUNT(*) по заметкам.
+        with self.assertNumQueries(2):
+            self.assertFalse(
+                NoteStats.objects.change(self.author.pk, 1, quota=True)
+            )
+        response = self.auth_client.post(
+            reverse('notes:add'), data=self.form_data
+        )
+        self.assertFormError(response, 'form', None, QUOTA_WARNING)
+        self.assertEqual(Note.objects.count(), 1)
+        self.assertEqual(self.note_count(), 1)
+
+    def test_personal_quota_overrides_default(self):
+        NoteStats.objects.create(user=self.author, quota=2)
+        rows = '\n'.join(json.dumps(self.form_data) for _ in range(3))
+        response = self.auth_client.post(
+            reverse('notes:import'), data=rows,
+            content_type='application/x-ndjson'
+        )
+        result = response.json()
+        # В квоту попадает начало пачки, остальные строки — ошибки.
+        self.assertEqual((result['created'], result['note_count']), (2, 2))
+        self.assertEqual(result['errors'][0]['line'], 3)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_reconcile_fixes_drift(self):
+        # Обычный bulk_create обходит счётчики.
+        Note.objects.bulk_create(
+            Note(title='Заметка', text='Текст', slug=f'slug-{index}',
+                 author=self.author)
+            for index in range(2)
+        )
+        self.assertEqual(self.note_count(), 0)
+        out = StringIO()
+        call_command('reconcile_note_stats', stdout=out)
+        self.assertIn('создано: 1', out.getvalue())
+        self.assertEqual(self.note_count(), 2)
+
+
+class TestSqliteProfile(TestCase):
+
+    def test_pragmas_are_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # 1 — NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class TestCachedUserBackend(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('Автор', password='password')
+
+    def test_sessions_of_model_backend_stay_valid(self):
+        self.client.force_login(
+            self.author, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = self.client.get(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_wrong_password_is_checked_once(self):
+        with mock.patch.object(
+            User, 'check_password', autospec=True, return_value=False
+        ) as check_password:
+            self.assertIsNone(authenticate(
+                username=self.author.username, password='wrong'
+            ))
+        self.assertEqual(check_password.call_count, 1)
+
+
+@override_settings(NOTES_READ_TOKENS=True)
+class TestReadTokens(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note', author=cls.author
+        )
+
+    def setUp(self):
+        session_client = Client()
+        session_client.force_login(self.author)
+        token = session_client.post(reverse('notes:token')).json()['token']
+        # Клиент без сессии, только с токеном в заголовке.
+        self.token_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_read_views_skip_session_and_user(self):
+        # Остаётся единственный запрос — за самой заметкой.
+        with self.assertNumQueries(1):
+            response = self.token_client.get(
+                reverse('notes:detail', args=(self.note.slug,))
+            )
+        self.assertContains(response, self.note.text)
+        response = self.token_client.get(reverse('notes:list'))
+        self.assertContains(response, self.note.title)
+
+    def test_write_views_require_session(self):
+        response = self.token_client.get(
+            reverse('notes:edit', args=(self.note.slug,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_token_cookie_is_dropped_on_logout(self):
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('notes:token'))
+        client.post(reverse('users:logout'))
+        response = client.get(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_token_cookie_does_not_override_session(self):
+        reader = User.objects.create(username='Читатель')
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('notes:token'))
+        # Другой пользователь входит в том же браузере, cookie осталась.
+        client.force_login(reader)
+        response = client.get(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, self.note.title)
+
+    def test_tampered_token_is_rejected(self):
+        client = Client(HTTP_AUTHORIZATION='Bearer 1:abc:def')
+        response = client.get(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
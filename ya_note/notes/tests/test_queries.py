@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from notes.models import Note
+from notes.tests.query_budget import QueryBudgetMixin, load_baseline
+
+User = get_user_model()
+
+# Объёмы данных, на которых снимается число запросов.
+SIZES = (1, 10, 100)
+
+
+class TestQueryBudget(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def create_notes(self, size):
+        Note.objects.all().delete()
+        # Массовые операции не сбрасывают кеш списка.
+        cache.clear()
+        Note.objects.bulk_create_with_slugs(
+            Note(
+                title=f'Заголовок-{index}',
+                text='Просто текст.',
+                slug=f'slug-{index}',
+                author=self.author,
+            )
+            for index in range(size)
+        )
+
+    def test_pages_fit_query_budget(self):
+        pages = (
+            ('notes:home', None, {}),
+            ('notes:list', None, {}),
+            ('notes:detail', ('slug-0',), {}),
+            ('notes:edit', ('slug-0',), {}),
+            ('notes:search', None, {'q': 'Заголовок'}),
+            ('notes:export', None, {}),
+        )
+        for size in SIZES:
+            self.create_notes(size)
+            for name, args, params in pages:
+                with self.subTest(name=name, size=size):
+                    url = reverse(name, args=args)
+                    with self.assertQueryBudget(name, size):
+                        response = self.client.get(url, params)
+                        # Выгрузка читает базу, пока отдаётся тело ответа.
+                        b''.join(response)
+
+    def test_query_budget_does_not_grow_with_data(self):
+        # На малых объёмах страница может быть неполной и обходиться
+        # дешевле, поэтому сравниваем два самых больших объёма.
+        for name, budgets in load_baseline().items():
+            with self.subTest(name=name):
+                *_, smaller, larger = (budgets[str(size)] for size in SIZES)
+                self.assertEqual(
+                    smaller, larger,
+                    f'Число запросов {name} зависит от объёма данных: '
+                    f'{budgets}'
+                )
@@ -1,10 +1,12 @@
+import logging
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from notes.models import Note
+from yacommon.metrics import registry
 
 
 User = get_user_model()
@@ -78,3 +80,30 @@ class TestRoutes(TestCase):
                 response = self.client.get(url)
                 # Проверяем, что редирект приведёт именно на указанную ссылку.
                 self.assertRedirects(response, redirect_url)
+
+
+@override_settings(METRICS_ENABLED=True)
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        registry.reset()
+
+    def test_metrics_are_exported_for_local_clients(self):
+        author = User.objects.create(username='Лев Толстой')
+        self.client.force_login(author)
+        self.client.get(reverse('notes:list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn(
+            'django_view_requests_total{view="notes:list"} 1',
+            response.content.decode()
+        )
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_log_file_follows_setting(self):
+        [handler] = logging.getLogger('metrics').handlers
+        record = logging.makeLogRecord({'msg': 'notes:list'})
+        self.assertTrue(handler.filter(record))
+        with override_settings(METRICS_ENABLED=False):
+            self.assertFalse(handler.filter(record))
@@ -0,0 +1,63 @@
+"""
+Подписанные токены для чтения заметок без сессии.
+
+Токен — подписанные SECRET_KEY id и имя пользователя с меткой времени.
+Проверка токена не обращается ни к таблице сессий, ни к таблице
+пользователей, поэтому отозвать его до истечения срока нельзя:
+срок NOTES_READ_TOKEN_MAX_AGE должен быть коротким.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'notes.tokens'
+
+
+class TokenUser:
+    """Пользователь из токена: только id и имя, без строки в БД."""
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, pk, username):
+        self.pk = self.id = pk
+        self.username = username
+
+    def __str__(self):
+        return self.username
+
+    def get_username(self):
+        return self.username
+
+
+def issue_token(user):
+    return signing.TimestampSigner(salt=SALT).sign_object(
+        {'id': user.pk, 'username': user.get_username()}
+    )
+
+
+def get_token_user(request):
+    """
+    Пользователь из токена в Authorization или cookie, иначе None.
+
+    Cookie учитывается, только если у браузера нет cookie сессии:
+    иначе токен, оставшийся от прошлого входа, подменил бы того,
+    кто вошёл сейчас. Проверка не читает саму сессию.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        token = header[len('Bearer '):]
+    elif settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return None
+    else:
+        token = request.COOKIES.get(settings.NOTES_READ_TOKEN_COOKIE)
+    if not token:
+        return None
+    try:
+        payload = signing.TimestampSigner(salt=SALT).unsign_object(
+            token, max_age=settings.NOTES_READ_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return TokenUser(payload['id'], payload['username'])
@@ -0,0 +1,22 @@
+"""Транслитерация заголовков заметок с кешированием."""
+from functools import lru_cache
+
+from django.conf import settings
+from pytils.translit import slugify
+
+
+@lru_cache(maxsize=settings.NOTES_SLUGIFY_CACHE_SIZE)
+def cached_slugify(title):
+    """
+    Функция slugify из pytils, запомненная для последних заголовков.
+
+    Заголовки заметок часто повторяются, а транслитерация — самая
+    дорогая часть подбора slug. Исходная функция доступна как
+    cached_slugify.__wrapped__.
+    """
+    return slugify(title)
+
+
+def slugify_cache_info():
+    """Попадания, промахи и заполненность кеша транслитерации."""
+    return cached_slugify.cache_info()
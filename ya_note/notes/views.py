@@ -1,9 +1,22 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import views as auth_views
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.core.exceptions import BadRequest
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
 from django.urls import reverse_lazy
 from django.views import generic
 
+from .cache import cache_list_page, get_list_cache_key, invalidate_notes_list
 from .forms import NoteForm
-from .models import Note
+from .importer import import_notes
+from .search import search_notes
+from .models import Note, NoteQuotaExceeded, NoteStats
+from .tokens import get_token_user, issue_token
 
 
 class Home(generic.TemplateView):
@@ -23,7 +36,26 @@ class NoteBase(LoginRequiredMixin):
 
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(author_id=self.request.user.pk)
+
+
+class ReadTokenMixin:
+    """
+    Вход по токену для представлений, которые только читают заметки.
+
+    При включённой NOTES_READ_TOKENS GET с действительным токеном
+    обслуживается без сессии: request.user заменяется на TokenUser
+    до проверки LoginRequiredMixin, поэтому ни сессия, ни пользователь
+    из БД не загружаются. Без токена работает обычная сессия,
+    и cookie с токеном её не перекрывает (см. get_token_user).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if settings.NOTES_READ_TOKENS and request.method == 'GET':
+            user = get_token_user(request)
+            if user is not None:
+                request.user = user
+        return super().dispatch(request, *args, **kwargs)
 
 
 class NoteCreate(NoteBase, generic.CreateView):
@@ -34,7 +66,12 @@ class NoteCreate(NoteBase, generic.CreateView):
     def form_valid(self, form):
         new_note = form.save(commit=False)
         new_note.author = self.request.user
-        new_note.save()
+        try:
+            new_note.save()
+        except NoteQuotaExceeded as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        invalidate_notes_list(self.request.user.pk)
         return super().form_valid(form)
 
 
@@ -43,17 +80,189 @@ class NoteUpdate(NoteBase, generic.UpdateView):
     template_name = 'notes/form.html'
     form_class = NoteForm
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        invalidate_notes_list(self.request.user.pk)
+        return response
+
 
 class NoteDelete(NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
 
+    def delete(self, request, *args, **kwargs):
+        response = super().delete(request, *args, **kwargs)
+        invalidate_notes_list(request.user.pk)
+        return response
+
+
+class NotesPage(list):
+    """Уже загруженная страница заметок с count(), как у QuerySet."""
+
+    def count(self, *args):
+        if args:
+            return super().count(*args)
+        return len(self)
+
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(ReadTokenMixin, NoteBase, generic.ListView):
+    """
+    Список всех заметок пользователя.
+
+    Заметки выводятся страницами по id: следующая страница начинается
+    после последней заметки текущей, поэтому OFFSET не нужен.
+    Отрендеренные страницы кешируются для каждого пользователя.
+    """
     template_name = 'notes/list.html'
+    paginate_by = settings.NOTES_COUNT_ON_NOTES_LIST_PAGE
+
+    def get(self, request, *args, **kwargs):
+        key = get_list_cache_key(request.user.pk, request.GET.get('after'))
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().get(request, *args, **kwargs)
+        response.add_post_render_callback(
+            lambda response: cache_list_page(key, response)
+        )
+        return response
+
+    def get_queryset(self):
+        queryset = super().get_queryset().order_by('pk')
+        after = self.request.GET.get('after')
+        if after:
+            if not after.isdigit():
+                raise BadRequest('Некорректный курсор.')
+            queryset = queryset.filter(pk__gt=after)
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Вместо Paginator берём страницу, начинающуюся после курсора.
 
+        Лишняя строка в выборке показывает, есть ли следующая страница.
+        """
+        object_list = NotesPage(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(object_list) > page_size:
+            del object_list[page_size:]
+            self.next_cursor = object_list[-1].pk
+        return None, None, object_list, self.next_cursor is not None
 
-class NoteDetail(NoteBase, generic.DetailView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['note_count'] = NoteStats.count_for(self.request.user.pk)
+        return context
+
+
+class NoteDetail(ReadTokenMixin, NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteExport(NoteBase, generic.View):
+    """
+    Выгрузка всех заметок пользователя в формате NDJSON.
+
+    Заметки читаются из БД порциями и сразу отдаются клиенту,
+    поэтому память не зависит от их количества.
+    """
+    fields = ('id', 'title', 'text', 'slug')
+
+    def get(self, request, *args, **kwargs):
+        notes = self.get_queryset().order_by('pk').values(
+            *self.fields
+        ).iterator(chunk_size=settings.NOTES_EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            (json.dumps(note, ensure_ascii=False) + '\n' for note in notes),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'attachment; filename="notes.ndjson"'
+        return response
+
+
+class NoteImport(NoteBase, generic.View):
+    """
+    Массовый импорт заметок из NDJSON.
+
+    Строки принимаются в теле запроса или в файле из поля file.
+    В ответе — число созданных заметок и ошибки по номерам строк.
+    """
+
+    def post(self, request, *args, **kwargs):
+        lines = request.FILES['file'] if 'file' in request.FILES else request
+        result = import_notes(lines, request.user)
+        return JsonResponse({
+            'created': result.created,
+            'errors': [
+                {'line': line_number, 'errors': errors}
+                for line_number, errors in result.errors
+            ],
+            'note_count': NoteStats.count_for(request.user.pk),
+        })
+
+
+class NoteStatsView(ReadTokenMixin, LoginRequiredMixin, generic.View):
+    """Число заметок пользователя и его квота в JSON."""
+
+    def get(self, request, *args, **kwargs):
+        stats = NoteStats.objects.filter(pk=request.user.pk).first()
+        if stats is None:
+            stats = NoteStats(user_id=request.user.pk)
+        return JsonResponse({
+            'note_count': stats.note_count,
+            'quota': stats.effective_quota,
+        })
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя, самые релевантные — первыми."""
+    template_name = 'notes/search.html'
+    paginate_by = settings.NOTES_COUNT_ON_NOTES_LIST_PAGE
+
+    def get_queryset(self):
+        query = self.request.GET.get('q', '').strip()
+        if not query:
+            return self.model.objects.none()
+        return search_notes(query, self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class NoteToken(LoginRequiredMixin, generic.View):
+    """
+    Выдача токена для чтения заметок без сессии.
+
+    Токен возвращается в JSON для заголовка Authorization: Bearer
+    и ставится в cookie для браузера. Cookie удаляется при выходе.
+    """
+
+    def post(self, request, *args, **kwargs):
+        if not settings.NOTES_READ_TOKENS:
+            raise Http404
+        token = issue_token(request.user)
+        response = JsonResponse({
+            'token': token,
+            'expires_in': settings.NOTES_READ_TOKEN_MAX_AGE,
+        })
+        response.set_cookie(
+            settings.NOTES_READ_TOKEN_COOKIE, token,
+            max_age=settings.NOTES_READ_TOKEN_MAX_AGE,
+            httponly=True, samesite='Lax',
+        )
+        return response
+
+
+class Logout(auth_views.LogoutView):
+    """Выход, который заодно удаляет cookie с токеном чтения."""
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        response.delete_cookie(
+            settings.NOTES_READ_TOKEN_COOKIE, samesite='Lax'
+        )
+        return response
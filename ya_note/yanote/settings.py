@@ -1,8 +1,11 @@
+import sys
 from pathlib import Path
 
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+# Общий для ya_news и ya_note код лежит в корне репозитория (yacommon).
+sys.path.append(str(BASE_DIR.parent))
 
 SECRET_KEY = 'django-insecure-yipnj$#j!ajarq%k55z4kuf3x79)91h0h42o9!1ho(z=!%mt=#'
 
@@ -22,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,8 +58,33 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Обычный бэкенд SQLite с PRAGMA на каждом соединении,
+        # см. yacommon.sqlite.base.
+        'ENGINE': 'yacommon.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, PRAGMA не выполняются заново.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Сколько секунд ждать освобождения блокировки записи.
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Читатели не блокируют писателя и наоборот.
+                'journal_mode': 'WAL',
+                # В режиме WAL fsync только на контрольных точках.
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                # Отрицательное значение — размер кеша страниц в КиБ.
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -89,3 +118,76 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
 
 NOTES_COUNT_ON_NOTES_LIST_PAGE = 10
+# Сколько секунд хранится отрендеренная страница списка заметок.
+NOTES_LIST_CACHE_TIMEOUT = 60 * 5
+# Сколько последних заголовков помнит кеш транслитерации slug.
+NOTES_SLUGIFY_CACHE_SIZE = 4096
+# Сколько заметок за раз читается из БД при выгрузке в NDJSON.
+NOTES_EXPORT_CHUNK_SIZE = 2000
+# Сколько строк NDJSON проверяется и записывается одной пачкой при импорте.
+NOTES_IMPORT_BATCH_SIZE = 1000
+# Чтение заметок по подписанному токену без сессии (см. notes.tokens).
+NOTES_READ_TOKENS = False
+# Срок жизни токена в секундах: до его истечения токен не отозвать.
+NOTES_READ_TOKEN_MAX_AGE = 15 * 60
+NOTES_READ_TOKEN_COOKIE = 'notes_token'
+# Сколько заметок может быть у пользователя, None — без ограничения.
+# Личная квота задаётся в NoteStats.quota и важнее общей.
+NOTES_QUOTA = None
+
+# Сессии хранятся только в БД. cached_db здесь не годится: кеш
+# LocMemCache у каждого процесса свой, и сессия, закрытая выходом
+# в одном процессе, жила бы в кеше остальных до конца своего срока.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+AUTHENTICATION_BACKENDS = [
+    'yacommon.auth.CachedUserBackend',
+    # Для сессий, открытых до подключения кеша пользователей.
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Сколько секунд процесс помнит пользователя; 0 — не кешировать.
+# Смена пароля, блокировка и выход сбрасывают запись только в том
+# процессе, где они произошли: остальные до конца этого срока пускают
+# пользователя по старым данным, в том числе по сессиям, открытым
+# до смены пароля.
+AUTH_USER_CACHE_TIMEOUT = 5
+
+# Метрики запросов (см. yacommon.metrics): выключены по умолчанию.
+METRICS_ENABLED = False
+# Сколько раз один и тот же SQL может выполниться за запрос,
+# прежде чем он попадёт в лог как возможный N+1.
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+# Дополнительные метрики, которые снимаются при каждом запросе
+# metrics/: функции возвращают тройки (имя, описание, значение).
+METRICS_COLLECTORS = ()
+
+# Лог по каждому запросу пишется в файл с ротацией. Фильтр пропускает
+# записи, только пока METRICS_ENABLED включена, и проверяет её при
+# каждой записи, поэтому файл не создаётся, пока метрики выключены.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'metrics_enabled': {
+            '()': 'yacommon.metrics.MetricsEnabledFilter',
+        },
+    },
+    'handlers': {
+        'metrics': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'metrics.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'encoding': 'utf-8',
+            'filters': ['metrics_enabled'],
+        },
+    },
+    'loggers': {
+        'metrics': {
+            'handlers': ['metrics'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -4,9 +4,13 @@ from django.contrib.auth.forms import UserCreationForm
 from django.urls import include, path
 from django.views.generic import CreateView
 
+from notes.views import Logout
+from yacommon.metrics import metrics_view
+
 urlpatterns = [
     path('', include('notes.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 auth_urls = ([
@@ -17,7 +21,7 @@ auth_urls = ([
     ),
     path(
         'logout/',
-        auth_views.LogoutView.as_view(
+        Logout.as_view(
             template_name='registration/logout.html'
         ),
         name='logout',
@@ -0,0 +1,6 @@
+"""
+Код, общий для проектов ya_news и ya_note.
+
+Каталог репозитория добавляется в sys.path в настройках каждого
+проекта, поэтому пакет импортируется как yacommon.
+"""
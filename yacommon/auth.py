@@ -0,0 +1,68 @@
+"""
+Бэкенд аутентификации с кешем пользователей в памяти процесса.
+
+AuthenticationMiddleware достаёт пользователя из БД на каждом запросе.
+Здесь найденный пользователь хранится AUTH_USER_CACHE_TIMEOUT секунд.
+Запись сбрасывается при сохранении пользователя (смена пароля,
+блокировка) и при выходе. Другие процессы узнают об этом не позже,
+чем истечёт срок, поэтому он должен быть коротким.
+
+ModelBackend остаётся в AUTHENTICATION_BACKENDS после этого бэкенда:
+в сессиях, открытых до его подключения, записан путь ModelBackend,
+и без него в списке они перестали бы действовать.
+"""
+import copy
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.core.exceptions import PermissionDenied
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# id пользователя -> (момент устаревания, пользователь).
+_users = {}
+
+
+def evict_user(user_id):
+    _users.pop(user_id, None)
+
+
+def clear_user_cache():
+    _users.clear()
+
+
+class CachedUserBackend(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+        if user is None and password is not None:
+            # Пароль уже проверен: не даём ModelBackend из списка
+            # хешировать его второй раз.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        entry = _users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            # Копия: запрос может менять атрибуты своего пользователя.
+            return copy.copy(entry[1])
+        user = super().get_user(user_id)
+        if user is not None and timeout:
+            _users[user_id] = (time.monotonic() + timeout, user)
+        return copy.copy(user)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    evict_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        evict_user(user.pk)
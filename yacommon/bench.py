@@ -0,0 +1,39 @@
+"""Общие части команд нагрузочных замеров."""
+import statistics
+from collections import Counter
+from time import perf_counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def measure(client, method, url, data, requests, warmup, **extra):
+    """
+    Задержки в миллисекундах, RPS и запросы к БД на один ответ.
+
+    extra передаётся в каждый запрос клиента, например content_type.
+    """
+    send = getattr(client, method)
+    for _ in range(warmup):
+        send(url, data, **extra)
+    latencies = []
+    queries = 0
+    statuses = Counter()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            response = send(url, data, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencies.append(perf_counter() - start)
+        queries += len(context)
+        statuses[response.status_code] += 1
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'rps': round(requests / sum(latencies), 1),
+        'queries_per_request': queries / requests,
+        'statuses': dict(statuses),
+    }
@@ -0,0 +1,172 @@
+"""
+Метрики запросов: число SQL-запросов, время SQL и шаблонов, размер ответа.
+
+Включается настройкой METRICS_ENABLED. Накопленные значения отдаются
+в текстовом формате Prometheus по адресу metrics/ только с адресов
+из METRICS_ALLOWED_IPS, а каждый запрос пишется в лог metrics.
+К ним добавляются метрики функций из METRICS_COLLECTORS.
+
+Настройки читаются при каждом обращении, поэтому override_settings
+включает и выключает метрики вместе с их логом.
+"""
+import logging
+import re
+from collections import Counter, defaultdict
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('metrics')
+
+# Списки параметров IN (%s, %s, ...) разной длины — один и тот же запрос.
+PARAMS_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+METRICS = (
+    # Имя, тип, описание.
+    ('requests_total', 'counter', 'Обработанные запросы.'),
+    ('queries_total', 'counter', 'Выполненные SQL-запросы.'),
+    ('sql_seconds_total', 'counter', 'Время выполнения SQL.'),
+    ('template_seconds_total', 'counter', 'Время рендера шаблонов.'),
+    ('request_seconds_total', 'counter', 'Полное время обработки.'),
+    ('response_bytes_total', 'counter', 'Размер тел ответов.'),
+    ('n_plus_one_total', 'counter', 'Запросы с повторяющимся SQL.'),
+)
+
+
+class MetricsEnabledFilter(logging.Filter):
+    """Пропускает записи в файл лога, только пока включены метрики."""
+
+    def filter(self, record):
+        return settings.METRICS_ENABLED
+
+
+class Registry:
+    """Накопленные в процессе значения метрик по именам маршрутов."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.values = defaultdict(Counter)
+
+    def add(self, view, **values):
+        with self.lock:
+            self.values[view].update(values)
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus."""
+        with self.lock:
+            values = {view: dict(data) for view, data in self.values.items()}
+        lines = []
+        for name, kind, description in METRICS:
+            lines.append(f'# HELP django_view_{name} {description}')
+            lines.append(f'# TYPE django_view_{name} {kind}')
+            for view, data in sorted(values.items()):
+                lines.append(
+                    f'django_view_{name}{{view="{view}"}} {data.get(name, 0)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """Обёртка connection.execute_wrapper: считает запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - start
+            self.count += 1
+            self.shapes[PARAMS_LIST.sub('(...)', sql)] += 1
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.template_seconds = 0.0
+        start = perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        elapsed = perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        repeated = {
+            sql: count for sql, count in recorder.shapes.items()
+            if count > settings.METRICS_N_PLUS_ONE_THRESHOLD
+        }
+        size = 0 if response.streaming else len(response.content)
+        registry.add(
+            view,
+            requests_total=1,
+            queries_total=recorder.count,
+            sql_seconds_total=recorder.seconds,
+            template_seconds_total=request.template_seconds,
+            request_seconds_total=elapsed,
+            response_bytes_total=size,
+            n_plus_one_total=int(bool(repeated)),
+        )
+        logger.info(
+            '%s %s status=%s queries=%s sql=%.4f template=%.4f total=%.4f '
+            'bytes=%s',
+            view, request.path, response.status_code, recorder.count,
+            recorder.seconds, request.template_seconds, elapsed, size,
+        )
+        for sql, count in repeated.items():
+            logger.warning(
+                'Возможный N+1 в %s: запрос выполнен %s раз: %s',
+                view, count, sql,
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        """Засекаем рендер: он выполняется после этого хука."""
+        start = perf_counter()
+
+        def finish(response):
+            request.template_seconds += perf_counter() - start
+
+        response.add_post_render_callback(finish)
+        return response
+
+
+def render_collected():
+    """Метрики из METRICS_COLLECTORS: значения на момент запроса."""
+    lines = []
+    for path in settings.METRICS_COLLECTORS:
+        for name, description, value in import_string(path)():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+    return ''.join(line + '\n' for line in lines)
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus, только для локальных адресов."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render() + render_collected(),
+        content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,41 @@
+"""
+SQLite с настройкой каждого нового соединения.
+
+Кроме параметров sqlite3.connect, в OPTIONS принимаются:
+pragmas — словарь PRAGMA, выполняемых сразу после подключения;
+transaction_mode — чем открывать atomic(): DEFERRED, IMMEDIATE
+или EXCLUSIVE.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pragmas = {}
+    transaction_mode = 'DEFERRED'
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        mode = params.pop('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}.'
+            )
+        self.transaction_mode = mode
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        # При DEFERRED транзакция, начавшаяся с чтения, не может дождаться
+        # записи: SQLite сразу отвечает «database is locked», не глядя
+        # на timeout. IMMEDIATE берёт блокировку записи в начале
+        # и ждёт её в пределах timeout.
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')